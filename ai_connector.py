@@ -4,13 +4,108 @@ Integrates with Conversational AI platforms
 Supports: Dialogflow, Rasa, OpenAI, custom AI services
 """
 
+import asyncio
 import logging
+import os
+import random
+import re
 import httpx
-from typing import Dict, Optional, Any
+import orjson
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Optional, Any, Awaitable, Callable, Tuple
 from models import AIRequest, AIResponse, CallSession
 
 logger = logging.getLogger(__name__)
 
+# Mock intent rules: (keyword pattern, intent, message, action)
+# Order matters - the first matching rule wins
+MOCK_INTENT_PATTERNS = tuple(
+    (re.compile("|".join(re.escape(word) for word in keywords)), intent, message, action)
+    for keywords, intent, message, action in (
+        (
+            ("book", "booking", "reserve", "ticket"),
+            "book_flight",
+            "I can help you book a flight. Are you looking for a domestic or international flight?",
+            "collect_booking_type"
+        ),
+        (
+            ("status", "check", "flight status"),
+            "check_status",
+            "I can check your flight status. Please provide your flight number.",
+            "collect_flight_id"
+        ),
+        (
+            ("cancel", "cancellation"),
+            "cancel_booking",
+            "I can help you cancel your booking. Please provide your booking ID.",
+            "collect_booking_id"
+        ),
+        (
+            ("domestic",),
+            "domestic_flight",
+            "Great! Where would you like to fly from?",
+            "collect_origin"
+        ),
+        (
+            ("international",),
+            "international_flight",
+            "Perfect! Which city will you be departing from?",
+            "collect_origin"
+        ),
+        (
+            ("agent", "representative", "human"),
+            "speak_to_agent",
+            "I'll connect you with an agent. Please hold.",
+            "transfer_agent"
+        ),
+    )
+)
+
+# Intent -> next action (read-only)
+ACTION_MAP = MappingProxyType({
+    "book_flight": "collect_booking_type",
+    "check_status": "collect_flight_id",
+    "cancel_booking": "collect_booking_id",
+    "speak_to_agent": "transfer_agent"
+})
+
+# Keyword rules for provider intent extraction, checked in order
+INTENT_KEYWORDS = (
+    (("book",), "book_flight"),
+    (("status", "check"), "check_status"),
+    (("cancel",), "cancel_booking"),
+)
+
+# Cap on concurrent OpenAI/Dialogflow calls per process, to stay under provider rate limits
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+
+# Attempts per provider call when the provider answers 429 Too Many Requests
+RATE_LIMIT_ATTEMPTS = 3
+
+# Headers for JSON bodies pre-serialized with orjson
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# System prompt sent ahead of every OpenAI conversation
+OPENAI_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an Air India customer support assistant. Help users book flights, check status, and handle cancellations. Keep responses concise and clear for voice interaction."
+}
+
+
+@lru_cache(maxsize=1024)
+def classify_mock_intent(user_input_lower: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Match lowercased input against MOCK_INTENT_PATTERNS
+    
+    Returns:
+        (intent, message, action) for the first matching rule, or None
+    """
+    for pattern, intent, message, action in MOCK_INTENT_PATTERNS:
+        if pattern.search(user_input_lower):
+            return intent, message, action
+    return None
+
 
 class AIConnector:
     """
@@ -27,8 +122,35 @@ class AIConnector:
         self.ai_service = ai_service
         self.api_key = api_key
         self.endpoint = endpoint
-        self.client = httpx.AsyncClient(timeout=30.0)
-        logger.info(f"AIConnector initialized with service: {ai_service}")
+        
+        # Bearer headers are constant per connector, build them once
+        self._auth_headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        } if api_key else None
+        
+        # Shared pooled client: HTTP/2 lets concurrent AI calls multiplex
+        # over one TLS connection per provider host
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0),
+            limits=httpx.Limits(
+                max_connections=200,
+                max_keepalive_connections=50,
+                keepalive_expiry=60.0
+            )
+        )
+        # Provider handlers hold a slot for each outbound request
+        self._provider_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+        
+        # Service name -> handler, all called as (call_id, user_input, session_context, user_input_lower)
+        self._handlers: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {
+            "mock": self._mock_ai_response,
+            "dialogflow": self._dialogflow_request,
+            "openai": self._openai_request,
+            "rasa": self._rasa_request
+        }
+        logger.info("AIConnector initialized with service: %s", ai_service)
     
     async def process_input(
         self, 
@@ -47,67 +169,43 @@ class AIConnector:
         Returns:
             AI response with message and action
         """
-        logger.info(f"Processing input for {call_id}: {user_input}")
+        logger.info("Processing input for %s: %s", call_id, user_input)
+        
+        # Normalize once per turn; downstream helpers reuse it
+        user_input_lower = user_input.lower()
         
         # Route to appropriate AI service
-        if self.ai_service == "mock":
-            return await self._mock_ai_response(user_input, session_context)
-        elif self.ai_service == "dialogflow":
-            return await self._dialogflow_request(call_id, user_input, session_context)
-        elif self.ai_service == "openai":
-            return await self._openai_request(call_id, user_input, session_context)
-        elif self.ai_service == "rasa":
-            return await self._rasa_request(call_id, user_input, session_context)
-        else:
+        try:
+            handler = self._handlers[self.ai_service]
+        except KeyError:
             raise ValueError(f"Unsupported AI service: {self.ai_service}")
+        
+        return await handler(call_id, user_input, session_context, user_input_lower)
     
     async def _mock_ai_response(
         self, 
+        call_id: str,
         user_input: str,
-        session_context: CallSession
+        session_context: CallSession,
+        user_input_lower: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Mock AI responses for testing (without external AI service)
         Replace this with real AI integration
         """
-        user_input_lower = user_input.lower()
+        if user_input_lower is None:
+            user_input_lower = user_input.lower()
         
-        # Intent detection (simple keyword matching)
-        if any(word in user_input_lower for word in ["book", "booking", "reserve", "ticket"]):
-            intent = "book_flight"
-            message = "I can help you book a flight. Are you looking for a domestic or international flight?"
-            action = "collect_booking_type"
-            
-        elif any(word in user_input_lower for word in ["status", "check", "flight status"]):
-            intent = "check_status"
-            message = "I can check your flight status. Please provide your flight number."
-            action = "collect_flight_id"
-            
-        elif any(word in user_input_lower for word in ["cancel", "cancellation"]):
-            intent = "cancel_booking"
-            message = "I can help you cancel your booking. Please provide your booking ID."
-            action = "collect_booking_id"
-            
-        elif any(word in user_input_lower for word in ["domestic"]):
-            intent = "domestic_flight"
-            message = "Great! Where would you like to fly from?"
-            action = "collect_origin"
-            
-        elif any(word in user_input_lower for word in ["international"]):
-            intent = "international_flight"
-            message = "Perfect! Which city will you be departing from?"
-            action = "collect_origin"
-            
-        elif any(word in user_input_lower for word in ["agent", "representative", "human"]):
-            intent = "speak_to_agent"
-            message = "I'll connect you with an agent. Please hold."
-            action = "transfer_agent"
-            
+        # Intent detection (precompiled keyword patterns, memoized per input)
+        matched = classify_mock_intent(user_input_lower)
+        if matched:
+            intent, message, action = matched
         else:
             # Handle context-based responses
             current_intent = session_context.current_intent
+            intent = current_intent
             
-            if current_intent == "book_flight" and session_context.booking_data:
+            if current_intent == "book_flight" and session_context.booking_data is not None:
                 booking = session_context.booking_data
                 
                 if "origin" not in booking:
@@ -157,7 +255,8 @@ class AIConnector:
         self, 
         call_id: str,
         user_input: str,
-        session_context: CallSession
+        session_context: CallSession,
+        user_input_lower: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Send request to Google Dialogflow
@@ -181,15 +280,10 @@ class AIConnector:
             }
         }
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         try:
-            response = await self.client.post(url, json=payload, headers=headers)
+            response = await self._post_rate_limited(url, payload, self._auth_headers)
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
             
             query_result = result.get("queryResult", {})
             
@@ -203,14 +297,15 @@ class AIConnector:
             }
             
         except Exception as e:
-            logger.error(f"Dialogflow request failed: {e}")
+            logger.error("Dialogflow request failed: %s", e)
             return self._error_response(call_id)
     
     async def _openai_request(
         self, 
         call_id: str,
         user_input: str,
-        session_context: CallSession
+        session_context: CallSession,
+        user_input_lower: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Send request to OpenAI API
@@ -221,15 +316,10 @@ class AIConnector:
             raise ValueError("OpenAI API key required")
         
         # Build conversation history
-        messages = [
-            {
-                "role": "system",
-                "content": "You are an Air India customer support assistant. Help users book flights, check status, and handle cancellations. Keep responses concise and clear for voice interaction."
-            }
-        ]
+        messages = [OPENAI_SYSTEM_MESSAGE]
         
         # Add conversation history
-        for interaction in session_context.interactions[-5:]:  # Last 5 interactions
+        for interaction in session_context.recent_interactions:
             role = "user" if interaction.speaker == "user" else "assistant"
             messages.append({"role": role, "content": interaction.message})
         
@@ -243,24 +333,22 @@ class AIConnector:
             "max_tokens": 150
         }
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         try:
-            response = await self.client.post(
+            response = await self._post_rate_limited(
                 "https://api.openai.com/v1/chat/completions",
-                json=payload,
-                headers=headers
+                payload,
+                self._auth_headers
             )
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
             
             ai_message = result["choices"][0]["message"]["content"]
             
             # Extract intent and action from response (you may need function calling)
-            intent = self._extract_intent(user_input, ai_message)
+            intent = self._extract_intent(
+                user_input_lower if user_input_lower is not None else user_input.lower(),
+                ai_message
+            )
             action = self._determine_action(intent)
             
             return {
@@ -273,14 +361,40 @@ class AIConnector:
             }
             
         except Exception as e:
-            logger.error(f"OpenAI request failed: {e}")
+            logger.error("OpenAI request failed: %s", e)
             return self._error_response(call_id)
     
+    async def _post_rate_limited(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]]
+    ) -> httpx.Response:
+        """
+        POST to a rate-limited provider under the concurrency cap,
+        backing off and retrying on 429 responses
+        """
+        for attempt in range(RATE_LIMIT_ATTEMPTS):
+            async with self._provider_slots:
+                response = await self.client.post(
+                    url, content=orjson.dumps(payload), headers=headers
+                )
+            if response.status_code != 429 or attempt == RATE_LIMIT_ATTEMPTS - 1:
+                return response
+            await asyncio.sleep(self._rate_limit_backoff(attempt))
+        return response
+    
+    @staticmethod
+    def _rate_limit_backoff(attempt: int) -> float:
+        """Jittered exponential backoff: ~0.5-1s, 1-2s, 2-4s (capped)"""
+        return min(4.0, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+    
     async def _rasa_request(
         self, 
         call_id: str,
         user_input: str,
-        session_context: CallSession
+        session_context: CallSession,
+        user_input_lower: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Send request to Rasa NLU
@@ -291,29 +405,29 @@ class AIConnector:
             raise ValueError("Rasa endpoint required")
         
         url = f"{self.endpoint}/model/parse"
+        core_url = f"{self.endpoint}/webhooks/rest/webhook"
         
         payload = {
             "text": user_input,
             "message_id": call_id
         }
+        core_payload = {
+            "sender": call_id,
+            "message": user_input
+        }
         
         try:
-            response = await self.client.post(url, json=payload)
+            # NLU parse and Core webhook are independent - run them concurrently
+            response, core_response = await asyncio.gather(
+                self.client.post(url, content=orjson.dumps(payload), headers=JSON_HEADERS),
+                self.client.post(core_url, content=orjson.dumps(core_payload), headers=JSON_HEADERS)
+            )
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
+            core_result = orjson.loads(core_response.content)
             
             intent_data = result.get("intent", {})
             
-            # Get response from Rasa Core
-            core_url = f"{self.endpoint}/webhooks/rest/webhook"
-            core_payload = {
-                "sender": call_id,
-                "message": user_input
-            }
-            
-            core_response = await self.client.post(core_url, json=core_payload)
-            core_result = core_response.json()
-            
             bot_message = core_result[0].get("text", "") if core_result else "I didn't understand that."
             
             return {
@@ -326,7 +440,7 @@ class AIConnector:
             }
             
         except Exception as e:
-            logger.error(f"Rasa request failed: {e}")
+            logger.error("Rasa request failed: %s", e)
             return self._error_response(call_id)
     
     def _build_dialogflow_contexts(self, session_context: CallSession) -> list:
@@ -342,30 +456,17 @@ class AIConnector:
         
         return contexts
     
-    def _extract_intent(self, user_input: str, ai_response: str) -> str:
-        """Extract intent from user input and AI response"""
+    def _extract_intent(self, user_input_lower: str, ai_response: str) -> str:
+        """Extract intent from (lowercased) user input and AI response"""
         # Simple keyword-based extraction (enhance with better NLP)
-        user_lower = user_input.lower()
-        
-        if "book" in user_lower:
-            return "book_flight"
-        elif "status" in user_lower or "check" in user_lower:
-            return "check_status"
-        elif "cancel" in user_lower:
-            return "cancel_booking"
-        else:
-            return "general_inquiry"
+        for keywords, intent in INTENT_KEYWORDS:
+            if any(word in user_input_lower for word in keywords):
+                return intent
+        return "general_inquiry"
     
     def _determine_action(self, intent: Optional[str]) -> Optional[str]:
         """Map intent to next action"""
-        action_map = {
-            "book_flight": "collect_booking_type",
-            "check_status": "collect_flight_id",
-            "cancel_booking": "collect_booking_id",
-            "speak_to_agent": "transfer_agent"
-        }
-        
-        return action_map.get(intent) if intent else None
+        return ACTION_MAP.get(intent) if intent else None
     
     def _error_response(self, call_id: str) -> Dict[str, Any]:
         """Generate error response"""
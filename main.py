@@ -5,10 +5,15 @@ Run with: uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
 """
 
 from fastapi import FastAPI, Request, HTTPException, Form
-from fastapi.responses import Response, PlainTextResponse
+from fastapi.responses import Response, PlainTextResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import TypeAdapter
+import itertools
 import logging
+import orjson
+import time
 from datetime import datetime
+from types import MappingProxyType
 from typing import Optional
 import os
 from dotenv import load_dotenv
@@ -21,10 +26,10 @@ from models import (
     VXMLRequest, AIRequest, CallSession, 
     FlightBooking, FlightStatus
 )
-from session_manager import SessionManager
-from vxml_handler import VXMLHandler
+from session_manager import SessionManager, RedisSessionManager, create_redis_client
+from vxml_handler import get_vxml_handler
 from ai_connector import AIConnector
-from twilio_integration import TwilioIntegration
+from twilio_integration import get_twilio_integration
 
 # Configure logging
 logging.basicConfig(
@@ -33,37 +38,70 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Public URL Twilio calls back on; fixed for the life of the process
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
+GATHER_CALLBACK_URL = f"{BASE_URL}/twilio/gather"
+
 # Initialize FastAPI app
 app = FastAPI(
     title="IVR-AI Middleware",
     description="Middleware layer connecting VXML IVR and Twilio to Conversational AI",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware for cross-origin requests
+# Comma-separated ALLOWED_ORIGINS; a frozenset keeps the per-request origin check O(1)
+ALLOWED_ORIGINS = frozenset(
+    origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "*").split(",") if origin.strip()
+)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=ALLOWED_ORIGINS,
+    # Credentials are only valid with explicit origins, never with "*"
+    allow_credentials="*" not in ALLOWED_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 # Initialize components
+# Sessions live in Redis when REDIS_URL is set so all workers share them;
+# the Redis-backed manager is swapped in at startup
+REDIS_URL = os.getenv("REDIS_URL")
 session_manager = SessionManager()
-vxml_handler = VXMLHandler()
+vxml_handler = get_vxml_handler()
 ai_connector = AIConnector()
-twilio = TwilioIntegration()
+twilio = get_twilio_integration()
+twilio.set_callback_url(GATHER_CALLBACK_URL)
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Open one pooled async Redis client and share it across session I/O"""
+    global session_manager
+    if REDIS_URL:
+        app.state.redis = create_redis_client(REDIS_URL)
+        session_manager = RedisSessionManager(app.state.redis)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled AI service and session store connections"""
+    await ai_connector.close()
+    redis = getattr(app.state, "redis", None)
+    if redis is not None:
+        await redis.aclose()
+
 
 # Health check endpoint
 @app.get("/health")
-def health_check():
+async def health_check():
     """Check if the middleware is running"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "active_sessions": session_manager.get_active_session_count(),
-        "twilio_configured": twilio.client is not None,
+        "active_sessions": await session_manager.get_active_session_count(),
+        "twilio_configured": twilio.is_configured,
         "twilio_number": twilio.phone_number
     }
 
@@ -82,29 +120,26 @@ async def twilio_incoming_call(request: Request):
     try:
         # Parse Twilio request
         form_data = await request.form()
-        parsed_data = twilio.parse_twilio_request(dict(form_data))
+        parsed_data = twilio.parse_twilio_request(form_data)
         
         call_id = parsed_data["call_id"]
         caller_number = parsed_data["caller"]
         
-        logger.info(f"Twilio incoming call: {call_id} from {caller_number}")
+        logger.info("Twilio incoming call: %s from %s", call_id, caller_number)
         
         # Create new session
-        session = session_manager.create_session(
+        session = await session_manager.create_session(
             call_id=call_id,
             caller_number=caller_number
         )
         
         # Generate welcome TwiML
-        base_url = os.getenv("BASE_URL", "http://localhost:8000")
-        callback_url = f"{base_url}/twilio/gather"
-        
-        twiml = twilio.generate_welcome_twiml(callback_url)
+        twiml = twilio.generate_welcome_twiml(GATHER_CALLBACK_URL)
         
         return PlainTextResponse(content=twiml, media_type="text/xml")
     
     except Exception as e:
-        logger.error(f"Error handling Twilio incoming call: {e}")
+        logger.error("Error handling Twilio incoming call: %s", e)
         error_twiml = twilio.generate_error_twiml()
         return PlainTextResponse(content=error_twiml, media_type="text/xml")
 
@@ -119,23 +154,23 @@ async def twilio_gather_input(request: Request):
     try:
         # Parse Twilio request
         form_data = await request.form()
-        parsed_data = twilio.parse_twilio_request(dict(form_data))
+        parsed_data = twilio.parse_twilio_request(form_data)
         
         call_id = parsed_data["call_id"]
         user_input = parsed_data["user_input"]
         input_type = parsed_data["input_type"]
         
-        logger.info(f"Twilio input for {call_id}: {user_input} ({input_type})")
+        logger.info("Twilio input for %s: %s (%s)", call_id, user_input, input_type)
         
         # Get existing session
-        session = session_manager.get_session(call_id)
+        session = await session_manager.get_session(call_id)
         if not session:
-            logger.error(f"Session not found for {call_id}")
+            logger.error("Session not found for %s", call_id)
             error_twiml = twilio.generate_error_twiml("Session expired")
             return PlainTextResponse(content=error_twiml, media_type="text/xml")
         
         # Update session with user input
-        session_manager.add_interaction(call_id, "user", user_input)
+        await session_manager.add_interaction(call_id, "user", user_input)
         
         # Send to AI for processing
         ai_response = await ai_connector.process_input(
@@ -144,16 +179,14 @@ async def twilio_gather_input(request: Request):
             session_context=session
         )
         
-        # Update session with AI response
-        session_manager.add_interaction(call_id, "ai", ai_response["message"])
+        # Persist any booking/intent state the AI step changed, then log the reply
+        await session_manager.save_session(session)
+        await session_manager.add_interaction(call_id, "ai", ai_response["message"])
         
         # Generate TwiML response
-        base_url = os.getenv("BASE_URL", "http://localhost:8000")
-        callback_url = f"{base_url}/twilio/gather"
-        
         twiml = twilio.generate_response_twiml(
             message=ai_response["message"],
-            callback_url=callback_url,
+            callback_url=GATHER_CALLBACK_URL,
             enable_dtmf=True,
             next_action=ai_response.get("action")
         )
@@ -161,7 +194,7 @@ async def twilio_gather_input(request: Request):
         return PlainTextResponse(content=twiml, media_type="text/xml")
     
     except Exception as e:
-        logger.error(f"Error processing Twilio input: {e}")
+        logger.error("Error processing Twilio input: %s", e)
         error_twiml = twilio.generate_error_twiml()
         return PlainTextResponse(content=error_twiml, media_type="text/xml")
 
@@ -175,14 +208,14 @@ async def twilio_action(request: Request):
     """
     try:
         form_data = await request.form()
-        parsed_data = twilio.parse_twilio_request(dict(form_data))
+        parsed_data = twilio.parse_twilio_request(form_data)
         
         call_id = parsed_data["call_id"]
         
-        logger.info(f"Twilio action for {call_id}")
+        logger.info("Twilio action for %s", call_id)
         
         # Get session to check what action was completed
-        session = session_manager.get_session(call_id)
+        session = await session_manager.get_session(call_id)
         if not session:
             error_twiml = twilio.generate_error_twiml("Session expired")
             return PlainTextResponse(content=error_twiml, media_type="text/xml")
@@ -190,7 +223,7 @@ async def twilio_action(request: Request):
         # Process based on current intent
         if session.current_intent == "book_flight" and session.booking_data:
             # Complete booking
-            result = await process_flight_booking(call_id, session.booking_data)
+            result = process_flight_booking(call_id, session.booking_data)
             message = result["message"]
             success = result["success"]
         else:
@@ -201,12 +234,12 @@ async def twilio_action(request: Request):
         twiml = twilio.generate_confirmation_twiml(message, success)
         
         # End session
-        session_manager.end_session(call_id)
+        await session_manager.end_session(call_id)
         
         return PlainTextResponse(content=twiml, media_type="text/xml")
     
     except Exception as e:
-        logger.error(f"Error in Twilio action: {e}")
+        logger.error("Error in Twilio action: %s", e)
         error_twiml = twilio.generate_error_twiml()
         return PlainTextResponse(content=error_twiml, media_type="text/xml")
 
@@ -223,11 +256,11 @@ async def twilio_status_callback(request: Request):
         call_sid = form_data.get("CallSid")
         call_status = form_data.get("CallStatus")
         
-        logger.info(f"Twilio status callback: {call_sid} - {call_status}")
+        logger.info("Twilio status callback: %s - %s", call_sid, call_status)
         
         # Update session status if needed
         if call_status in ["completed", "failed", "no-answer"]:
-            session = session_manager.get_session(call_sid)
+            session = await session_manager.get_session(call_sid)
             if session:
                 from models import CallStatus as SessionStatus
                 status_map = {
@@ -235,12 +268,12 @@ async def twilio_status_callback(request: Request):
                     "failed": SessionStatus.FAILED,
                     "no-answer": SessionStatus.FAILED
                 }
-                session_manager.end_session(call_sid, status_map.get(call_status, SessionStatus.COMPLETED))
+                await session_manager.end_session(call_sid, status_map.get(call_status, SessionStatus.COMPLETED))
         
         return PlainTextResponse(content="OK", media_type="text/plain")
     
     except Exception as e:
-        logger.error(f"Error in status callback: {e}")
+        logger.error("Error in status callback: %s", e)
         return PlainTextResponse(content="ERROR", media_type="text/plain")
 
 
@@ -258,14 +291,14 @@ async def handle_incoming_call(request: Request):
     """
     try:
         # Parse incoming VXML request
-        body = await request.json()
+        body = orjson.loads(await request.body())
         call_id = body.get("CallSid") or body.get("call_id")
         caller_number = body.get("From") or body.get("caller")
         
-        logger.info(f"Incoming call: {call_id} from {caller_number}")
+        logger.info("Incoming call: %s from %s", call_id, caller_number)
         
         # Create new session
-        session = session_manager.create_session(
+        session = await session_manager.create_session(
             call_id=call_id,
             caller_number=caller_number
         )
@@ -276,7 +309,7 @@ async def handle_incoming_call(request: Request):
         return Response(content=vxml_response, media_type="application/xml")
     
     except Exception as e:
-        logger.error(f"Error handling incoming call: {e}")
+        logger.error("Error handling incoming call: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -289,20 +322,20 @@ async def handle_user_input(request: Request):
     WHERE THIS RUNS: Called by VXML IVR after capturing user input
     """
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
         call_id = body.get("call_id")
         user_input = body.get("user_input")  # Speech transcript or DTMF
         input_type = body.get("input_type", "speech")  # "speech" or "dtmf"
         
-        logger.info(f"User input for {call_id}: {user_input} ({input_type})")
+        logger.info("User input for %s: %s (%s)", call_id, user_input, input_type)
         
         # Get existing session
-        session = session_manager.get_session(call_id)
+        session = await session_manager.get_session(call_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
         # Update session with user input
-        session_manager.add_interaction(call_id, "user", user_input)
+        await session_manager.add_interaction(call_id, "user", user_input)
         
         # Send to AI for processing
         ai_response = await ai_connector.process_input(
@@ -311,8 +344,9 @@ async def handle_user_input(request: Request):
             session_context=session
         )
         
-        # Update session with AI response
-        session_manager.add_interaction(call_id, "ai", ai_response["message"])
+        # Persist any booking/intent state the AI step changed, then log the reply
+        await session_manager.save_session(session)
+        await session_manager.add_interaction(call_id, "ai", ai_response["message"])
         
         # Convert AI response to VXML
         vxml_response = vxml_handler.generate_response_vxml(
@@ -323,8 +357,10 @@ async def handle_user_input(request: Request):
         
         return Response(content=vxml_response, media_type="application/xml")
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing user input: {e}")
+        logger.error("Error processing user input: %s", e)
         # Return error VXML
         error_vxml = vxml_handler.generate_error_vxml()
         return Response(content=error_vxml, media_type="application/xml")
@@ -338,20 +374,20 @@ async def handle_transaction(request: Request):
     WHERE THIS RUNS: Called when user completes a specific action
     """
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
         call_id = body.get("call_id")
         transaction_type = body.get("transaction_type")
         transaction_data = body.get("data")
         
-        logger.info(f"Transaction for {call_id}: {transaction_type}")
+        logger.info("Transaction for %s: %s", call_id, transaction_type)
         
         # Process based on transaction type
         if transaction_type == "flight_booking":
-            result = await process_flight_booking(call_id, transaction_data)
+            result = process_flight_booking(call_id, transaction_data)
         elif transaction_type == "status_check":
-            result = await process_status_check(call_id, transaction_data)
+            result = process_status_check(call_id, transaction_data)
         elif transaction_type == "cancellation":
-            result = await process_cancellation(call_id, transaction_data)
+            result = process_cancellation(call_id, transaction_data)
         else:
             raise HTTPException(status_code=400, detail="Unknown transaction type")
         
@@ -364,7 +400,7 @@ async def handle_transaction(request: Request):
         return Response(content=vxml_response, media_type="application/xml")
     
     except Exception as e:
-        logger.error(f"Transaction error: {e}")
+        logger.error("Transaction error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -381,19 +417,19 @@ async def ai_webhook(request: Request):
     WHERE THIS RUNS: Called by your AI service (e.g., Dialogflow, Rasa)
     """
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
         call_id = body.get("call_id")
         ai_event = body.get("event")
         
-        logger.info(f"AI webhook for {call_id}: {ai_event}")
+        logger.info("AI webhook for %s: %s", call_id, ai_event)
         
         # Process AI event and update session
-        session_manager.update_session(call_id, {"ai_event": ai_event})
+        await session_manager.update_session(call_id, {"ai_event": ai_event})
         
         return {"status": "received", "call_id": call_id}
     
     except Exception as e:
-        logger.error(f"AI webhook error: {e}")
+        logger.error("AI webhook error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -402,71 +438,81 @@ async def ai_webhook(request: Request):
 # ============================================
 
 @app.get("/session/{call_id}")
-def get_session(call_id: str):
+async def get_session(call_id: str):
     """
     Retrieve session data for a specific call
     Useful for debugging and monitoring
     """
-    session = session_manager.get_session(call_id)
+    session = await session_manager.get_session(call_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session
+    return session.to_dict()
 
 
 @app.delete("/session/{call_id}")
-def end_session(call_id: str):
+async def end_session(call_id: str):
     """
     End a call session and cleanup resources
     """
-    session_manager.end_session(call_id)
+    await session_manager.end_session(call_id)
     return {"status": "session ended", "call_id": call_id}
 
 
 @app.get("/sessions/active")
-def get_active_sessions():
+async def get_active_sessions():
     """
     Get all active call sessions
     """
     return {
-        "count": session_manager.get_active_session_count(),
-        "sessions": session_manager.get_all_sessions()
+        "count": await session_manager.get_active_session_count(),
+        "sessions": await session_manager.get_all_sessions()
     }
 
 
 # ============================================
 # Business Logic Functions
 # ============================================
+# These are pure computation today, so they run inline without a
+# coroutine; make them async once they call a database or airline API
+
+# Validator built once and reused for every booking
+FLIGHT_BOOKING_ADAPTER = TypeAdapter(FlightBooking)
+
+# Suffix that keeps booking IDs unique when two land on the same nanosecond
+BOOKING_COUNTER = itertools.count()
+
+# Mock flight data (replace with actual database query)
+MOCK_FLIGHTS = MappingProxyType({
+    "AI1": {"status": "On Time", "origin": "Mumbai", "destination": "Delhi"},
+    "AI2": {"status": "Delayed", "origin": "Chennai", "destination": "Bangalore"},
+})
 
-async def process_flight_booking(call_id: str, data: dict):
+
+def process_flight_booking(call_id: str, data: dict):
     """Process a flight booking transaction"""
-    booking = FlightBooking(**data)
+    booking = FLIGHT_BOOKING_ADAPTER.validate_python(data)
     
     # Add business logic here (database, external API calls, etc.)
-    booking_id = f"BK{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    booking_id = f"BK{time.time_ns():016x}{next(BOOKING_COUNTER):04x}"
     
     return {
         "success": True,
         "booking_id": booking_id,
         "message": f"Booking confirmed from {booking.origin} to {booking.destination}",
-        "details": booking.dict()
+        "details": booking.model_dump()
     }
 
 
-async def process_status_check(call_id: str, data: dict):
+def process_status_check(call_id: str, data: dict):
     """Check flight status"""
     flight_id = data.get("flight_id")
+    flight = MOCK_FLIGHTS.get(flight_id)
     
-    # Mock flight data (replace with actual database query)
-    flights = {
-        "AI1": {"status": "On Time", "origin": "Mumbai", "destination": "Delhi"},
-        "AI2": {"status": "Delayed", "origin": "Chennai", "destination": "Bangalore"},
-    }
-    
-    if flight_id in flights:
+    if flight:
         return {
             "success": True,
             "flight_id": flight_id,
-            **flights[flight_id]
+            **flight
         }
     else:
         return {
@@ -475,7 +521,7 @@ async def process_status_check(call_id: str, data: dict):
         }
 
 
-async def process_cancellation(call_id: str, data: dict):
+def process_cancellation(call_id: str, data: dict):
     """Process booking cancellation"""
     booking_id = data.get("booking_id")
     
@@ -494,7 +540,7 @@ async def process_cancellation(call_id: str, data: dict):
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global error handler"""
-    logger.error(f"Unhandled exception: {exc}")
+    logger.error("Unhandled exception: %s", exc)
     return Response(
         content=vxml_handler.generate_error_vxml(),
         media_type="application/xml",
@@ -3,20 +3,40 @@ Data models for IVR-AI Middleware
 Defines the structure of data exchanged between systems
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Any, Deque
 from datetime import datetime
 from enum import Enum
+from collections import deque
+from dataclasses import dataclass, field
+import sys
+import time
 
+try:
+    from enum import StrEnum
+except ImportError:  # Python < 3.11
+    class StrEnum(str, Enum):
+        pass
 
-class InputType(str, Enum):
+
+# Number of recent interactions kept as conversation context for the AI
+RECENT_INTERACTIONS_LIMIT = 5
+
+# Interactions retained per call; older turns are dropped
+MAX_INTERACTIONS = 50
+
+# Rarely used models build their validators on first use instead of at import
+DEFERRED_BUILD = ConfigDict(defer_build=True)
+
+
+class InputType(StrEnum):
     """Type of user input"""
     SPEECH = "speech"
     DTMF = "dtmf"
     TEXT = "text"
 
 
-class CallStatus(str, Enum):
+class CallStatus(StrEnum):
     """Status of a call session"""
     ACTIVE = "active"
     COMPLETED = "completed"
@@ -44,6 +64,8 @@ class AIRequest(BaseModel):
 
 class AIResponse(BaseModel):
     """Response received from AI service"""
+    model_config = DEFERRED_BUILD
+    
     call_id: str
     message: str
     action: Optional[str] = None
@@ -52,28 +74,96 @@ class AIResponse(BaseModel):
     intent: Optional[str] = None
 
 
-class Interaction(BaseModel):
+# Session state is internal: plain slotted dataclasses skip Pydantic
+# validation on every turn. Untrusted input is validated by the models above.
+
+@dataclass(slots=True)
+class Interaction:
     """Single interaction in a conversation"""
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime
     speaker: str  # "user" or "ai"
     message: str
     input_type: Optional[InputType] = None
-
-
-class CallSession(BaseModel):
+    
+    def __post_init__(self) -> None:
+        # Handlers pass request fields straight through; keep None out of history
+        if not isinstance(self.speaker, str) or not isinstance(self.message, str):
+            raise TypeError("Interaction speaker and message must be strings")
+        
+        # Only "user"/"ai" ever occur; share one string object per value
+        self.speaker = sys.intern(self.speaker)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamp,
+            "speaker": self.speaker,
+            "message": self.message,
+            "input_type": self.input_type
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Interaction":
+        """Rebuild from to_dict output after a JSON round trip"""
+        input_type = data.get("input_type")
+        return cls(
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            speaker=data["speaker"],
+            message=data["message"],
+            input_type=InputType(input_type) if input_type else None
+        )
+
+
+@dataclass(slots=True)
+class CallSession:
     """Complete call session data"""
     call_id: str
     caller_number: str
-    start_time: datetime = Field(default_factory=datetime.now)
+    start_time: datetime = field(default_factory=datetime.now)
     end_time: Optional[datetime] = None
     status: CallStatus = CallStatus.ACTIVE
-    interactions: List[Interaction] = Field(default_factory=list)
-    context: Dict[str, Any] = Field(default_factory=dict)
+    interactions: Deque[Interaction] = field(default_factory=deque)
+    context: Dict[str, Any] = field(default_factory=dict)
     
     # Business-specific fields
     current_intent: Optional[str] = None
     booking_data: Optional[Dict[str, Any]] = None
     customer_id: Optional[str] = None
+    
+    # Ring buffer of the latest interactions (not serialized)
+    _recent_interactions: Deque[Interaction] = field(init=False, repr=False, compare=False)
+    
+    # time.monotonic() of the last activity, used for in-process expiry (not serialized)
+    last_activity: float = field(default_factory=time.monotonic, init=False, repr=False, compare=False)
+    
+    def __post_init__(self) -> None:
+        self.interactions = deque(self.interactions, maxlen=MAX_INTERACTIONS)
+        self._recent_interactions = deque(self.interactions, maxlen=RECENT_INTERACTIONS_LIMIT)
+    
+    @property
+    def recent_interactions(self) -> Deque[Interaction]:
+        """Last RECENT_INTERACTIONS_LIMIT interactions, oldest first"""
+        return self._recent_interactions
+    
+    def add_interaction(self, interaction: Interaction) -> None:
+        """Append to the bounded history and the recent-context ring"""
+        self.interactions.append(interaction)
+        self._recent_interactions.append(interaction)
+        self.last_activity = time.monotonic()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable view of the session (the recent ring is omitted)"""
+        return {
+            "call_id": self.call_id,
+            "caller_number": self.caller_number,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "status": self.status,
+            "interactions": [interaction.to_dict() for interaction in self.interactions],
+            "context": self.context,
+            "current_intent": self.current_intent,
+            "booking_data": self.booking_data,
+            "customer_id": self.customer_id
+        }
 
 
 class FlightBooking(BaseModel):
@@ -89,12 +179,16 @@ class FlightBooking(BaseModel):
 
 class FlightStatus(BaseModel):
     """Flight status query"""
+    model_config = DEFERRED_BUILD
+    
     flight_id: str = Field(..., description="Flight identifier (e.g., AI123)")
     query_time: datetime = Field(default_factory=datetime.now)
 
 
 class BookingCancellation(BaseModel):
     """Booking cancellation request"""
+    model_config = DEFERRED_BUILD
+    
     booking_id: str
     reason: Optional[str] = None
     refund_requested: bool = False
@@ -102,6 +196,8 @@ class BookingCancellation(BaseModel):
 
 class VXMLResponse(BaseModel):
     """Structured VXML response data"""
+    model_config = DEFERRED_BUILD
+    
     prompt: str
     next_action: Optional[str] = None
     grammar: Optional[str] = None
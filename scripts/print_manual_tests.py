@@ -0,0 +1,72 @@
+"""
+Print curl and httpx snippets for manually exercising a running server
+Usage: python scripts/print_manual_tests.py
+"""
+
+
+def run_manual_tests():
+    """
+    Manual test scenarios for validation
+    Run these after starting the server
+    """
+    print("\n" + "="*60)
+    print("MANUAL TEST SCENARIOS")
+    print("="*60 + "\n")
+    
+    print("1. Test Incoming Call:")
+    print("   curl -X POST http://localhost:8000/ivr/incoming-call \\")
+    print('     -H "Content-Type: application/json" \\')
+    print('     -d \'{"call_id": "manual_test_1", "caller": "+919876543210"}\'')
+    print()
+    
+    print("2. Test User Input:")
+    print("   curl -X POST http://localhost:8000/ivr/user-input \\")
+    print('     -H "Content-Type: application/json" \\')
+    print('     -d \'{"call_id": "manual_test_1", "user_input": "book a flight", "input_type": "speech"}\'')
+    print()
+    
+    print("3. Check Session:")
+    print("   curl http://localhost:8000/session/manual_test_1")
+    print()
+    
+    print("4. Test Flight Booking Transaction:")
+    print("   curl -X POST http://localhost:8000/ivr/transaction \\")
+    print('     -H "Content-Type: application/json" \\')
+    print('     -d \'{"call_id": "manual_test_1", "transaction_type": "flight_booking",')
+    print('          "data": {"origin": "Mumbai", "destination": "Delhi",')
+    print('                   "travel_date": "2025-11-15", "passenger_name": "John Doe",')
+    print('                   "passenger_contact": "+919876543210",')
+    print('                   "booking_type": "domestic", "num_passengers": 1}}\'')
+    print()
+    
+    print("5. Check Active Sessions:")
+    print("   curl http://localhost:8000/sessions/active")
+    print()
+    
+    print("6. End Session:")
+    print("   curl -X DELETE http://localhost:8000/session/manual_test_1")
+    print()
+    
+    print("\n" + "="*60)
+    print("TESTING WITH PYTHON")
+    print("="*60 + "\n")
+    
+    print("You can also test using Python directly:")
+    print()
+    print("import httpx")
+    print()
+    print("client = httpx.Client(base_url='http://localhost:8000')")
+    print()
+    print("# Test health")
+    print("response = client.get('/health')")
+    print("print(response.json())")
+    print()
+    print("# Test incoming call")
+    print("response = client.post('/ivr/incoming-call',")
+    print("    json={'call_id': 'test_001', 'caller': '+919876543210'})")
+    print("print(response.text)")
+    print()
+
+
+if __name__ == "__main__":
+    run_manual_tests()
\ No newline at end of file
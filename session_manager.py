@@ -4,26 +4,85 @@ Handles call session storage and management
 Maintains state across multiple IVR interactions
 """
 
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from itertools import islice
+from typing import Any, Dict, Optional, List
 import logging
-from models import CallSession, Interaction, CallStatus, InputType
+import time
+import orjson
+from models import CallSession, Interaction, CallStatus, InputType, MAX_INTERACTIONS
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # Redis is optional - the in-memory SessionManager works without it
+    aioredis = None
 
 logger = logging.getLogger(__name__)
 
+# Enum members bound once for the per-call paths
+_ACTIVE = CallStatus.ACTIVE
+_FAILED = CallStatus.FAILED
+
+# Merge booking fields into a live session and refresh its TTL/LRU entry
+# KEYS: session hash, interactions list, LRU zset
+# ARGV: booking JSON, TTL seconds, now, call_id
+MERGE_BOOKING_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    return 0
+end
+local raw = redis.call("HGET", KEYS[1], "booking_data")
+local stored = raw and cjson.decode(raw) or {}
+for field, value in pairs(cjson.decode(ARGV[1])) do
+    stored[field] = value
+end
+redis.call("HSET", KEYS[1], "booking_data", cjson.encode(stored))
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+redis.call("EXPIRE", KEYS[2], ARGV[2])
+redis.call("ZADD", KEYS[3], ARGV[3], ARGV[4])
+return 1
+"""
+
+
+def create_redis_client(redis_url: str, max_connections: int = 64):
+    """
+    Create the process-wide async Redis client
+    
+    Args:
+        redis_url: Redis connection URL
+        max_connections: Size of the shared connection pool
+        
+    Returns:
+        redis.asyncio.Redis bound to a single ConnectionPool
+    """
+    if aioredis is None:
+        raise ImportError("redis is required for RedisSessionManager (pip install redis)")
+    
+    return aioredis.from_url(
+        redis_url,
+        decode_responses=True,
+        max_connections=max_connections
+    )
+
 
 class SessionManager:
     """
-    Manages active call sessions
-    In production, use Redis or a database for distributed systems
+    Manages active call sessions in process memory
+    Use RedisSessionManager when running more than one worker
+    
+    Sessions are kept in LRU order and the least recently used one is
+    ended once max_sessions is exceeded, so calls that never send a
+    hang-up webhook cannot grow memory without bound
     """
     
-    def __init__(self, session_timeout_minutes: int = 30):
-        self.sessions: Dict[str, CallSession] = {}
+    def __init__(self, session_timeout_minutes: int = 30, max_sessions: int = 10000):
+        self.sessions: "OrderedDict[str, CallSession]" = OrderedDict()
+        self.max_sessions = max_sessions
         self.session_timeout = timedelta(minutes=session_timeout_minutes)
+        self.timeout_seconds = self.session_timeout.total_seconds()
         logger.info("SessionManager initialized")
     
-    def create_session(self, call_id: str, caller_number: str) -> CallSession:
+    async def create_session(self, call_id: str, caller_number: str) -> CallSession:
         """
         Create a new call session
         
@@ -35,23 +94,28 @@ class SessionManager:
             CallSession object
         """
         if call_id in self.sessions:
-            logger.warning(f"Session {call_id} already exists, returning existing")
+            logger.warning("Session %s already exists, returning existing", call_id)
             return self.sessions[call_id]
         
         session = CallSession(
             call_id=call_id,
             caller_number=caller_number,
             start_time=datetime.now(),
-            status=CallStatus.ACTIVE,
-            interactions=[],
+            status=_ACTIVE,
             context={}
         )
         
         self.sessions[call_id] = session
-        logger.info(f"Created session for call {call_id}")
+        logger.info("Created session for call %s", call_id)
+        
+        while len(self.sessions) > self.max_sessions:
+            oldest_id = next(iter(self.sessions))
+            logger.warning("Session limit reached, evicting %s", oldest_id)
+            await self.end_session(oldest_id, status=_FAILED)
+        
         return session
     
-    def get_session(self, call_id: str) -> Optional[CallSession]:
+    async def get_session(self, call_id: str) -> Optional[CallSession]:
         """
         Retrieve an existing session
         
@@ -66,16 +130,17 @@ class SessionManager:
         if session:
             # Check if session has timed out
             if self._is_session_expired(session):
-                logger.warning(f"Session {call_id} has expired")
-                self.end_session(call_id)
+                logger.warning("Session %s has expired", call_id)
+                await self.end_session(call_id)
                 return None
             
+            self.sessions.move_to_end(call_id)
             return session
         
-        logger.warning(f"Session {call_id} not found")
+        logger.warning("Session %s not found", call_id)
         return None
     
-    def update_session(self, call_id: str, updates: Dict) -> bool:
+    async def update_session(self, call_id: str, updates: Dict) -> bool:
         """
         Update session context with new data
         
@@ -86,15 +151,15 @@ class SessionManager:
         Returns:
             True if successful, False otherwise
         """
-        session = self.get_session(call_id)
+        session = await self.get_session(call_id)
         if not session:
             return False
         
         session.context.update(updates)
-        logger.info(f"Updated session {call_id} with {len(updates)} fields")
+        logger.info("Updated session %s with %s fields", call_id, len(updates))
         return True
     
-    def add_interaction(
+    async def add_interaction(
         self, 
         call_id: str, 
         speaker: str, 
@@ -113,7 +178,7 @@ class SessionManager:
         Returns:
             True if successful, False otherwise
         """
-        session = self.get_session(call_id)
+        session = await self.get_session(call_id)
         if not session:
             return False
         
@@ -124,11 +189,11 @@ class SessionManager:
             input_type=input_type
         )
         
-        session.interactions.append(interaction)
-        logger.info(f"Added {speaker} interaction to session {call_id}")
+        session.add_interaction(interaction)
+        logger.debug("Added %s interaction to session %s", speaker, call_id)
         return True
     
-    def get_conversation_history(
+    async def get_conversation_history(
         self, 
         call_id: str, 
         last_n: Optional[int] = None
@@ -143,16 +208,18 @@ class SessionManager:
         Returns:
             List of Interaction objects
         """
-        session = self.get_session(call_id)
+        session = await self.get_session(call_id)
         if not session:
             return []
         
-        interactions = session.interactions
         if last_n:
-            return interactions[-last_n:]
-        return interactions
+            # Walk back from the newest turn so only last_n items are touched
+            recent = list(islice(reversed(session.interactions), last_n))
+            recent.reverse()
+            return recent
+        return list(session.interactions)
     
-    def set_intent(self, call_id: str, intent: str) -> bool:
+    async def set_intent(self, call_id: str, intent: str) -> bool:
         """
         Set the current intent for a session
         
@@ -163,15 +230,15 @@ class SessionManager:
         Returns:
             True if successful, False otherwise
         """
-        session = self.get_session(call_id)
+        session = await self.get_session(call_id)
         if not session:
             return False
         
         session.current_intent = intent
-        logger.info(f"Set intent for {call_id}: {intent}")
+        logger.info("Set intent for %s: %s", call_id, intent)
         return True
     
-    def store_booking_data(self, call_id: str, booking_data: Dict) -> bool:
+    async def store_booking_data(self, call_id: str, booking_data: Dict) -> bool:
         """
         Store booking-related data in session
         
@@ -182,7 +249,7 @@ class SessionManager:
         Returns:
             True if successful, False otherwise
         """
-        session = self.get_session(call_id)
+        session = await self.get_session(call_id)
         if not session:
             return False
         
@@ -190,10 +257,26 @@ class SessionManager:
             session.booking_data = {}
         
         session.booking_data.update(booking_data)
-        logger.info(f"Stored booking data for {call_id}")
+        logger.info("Stored booking data for %s", call_id)
         return True
     
-    def end_session(self, call_id: str, status: CallStatus = CallStatus.COMPLETED) -> bool:
+    async def save_session(self, session: CallSession) -> bool:
+        """
+        Persist in-place changes made to a session object
+        (intent, booking data, context)
+        
+        Sessions are held by reference here, so this only checks the
+        session is still active
+        
+        Args:
+            session: Session returned by get_session
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        return session.call_id in self.sessions
+    
+    async def end_session(self, call_id: str, status: CallStatus = CallStatus.COMPLETED) -> bool:
         """
         End a call session
         
@@ -216,17 +299,17 @@ class SessionManager:
         # 2. Trigger any cleanup tasks
         # 3. Send session data to analytics pipeline
         
-        logger.info(f"Ended session {call_id} with status {status}")
+        logger.info("Ended session %s with status %s", call_id, status)
         
         # Remove from active sessions
         del self.sessions[call_id]
         return True
     
-    def get_active_session_count(self) -> int:
+    async def get_active_session_count(self) -> int:
         """Get count of active sessions"""
         return len(self.sessions)
     
-    def get_all_sessions(self) -> List[Dict]:
+    async def get_all_sessions(self) -> List[Dict]:
         """
         Get summary of all active sessions
         
@@ -245,7 +328,7 @@ class SessionManager:
             for session in self.sessions.values()
         ]
     
-    def cleanup_expired_sessions(self) -> int:
+    async def cleanup_expired_sessions(self) -> int:
         """
         Remove sessions that have exceeded timeout
         Should be called periodically
@@ -259,24 +342,450 @@ class SessionManager:
         ]
         
         for call_id in expired_ids:
-            self.end_session(call_id, status=CallStatus.FAILED)
+            await self.end_session(call_id, status=_FAILED)
         
-        logger.info(f"Cleaned up {len(expired_ids)} expired sessions")
+        logger.info("Cleaned up %s expired sessions", len(expired_ids))
         return len(expired_ids)
     
     def _is_session_expired(self, session: CallSession) -> bool:
-        """Check if a session has expired"""
-        if not session.interactions:
-            # No interactions yet, check start time
-            time_diff = datetime.now() - session.start_time
-        else:
-            # Check last interaction time
-            last_interaction = session.interactions[-1]
-            time_diff = datetime.now() - last_interaction.timestamp
+        """Check if a session has expired (monotonic clock, no datetime math)"""
+        return time.monotonic() - session.last_activity > self.timeout_seconds
+    
+    async def get_session_duration(self, call_id: str) -> Optional[timedelta]:
+        """
+        Get duration of a session
+        
+        Args:
+            call_id: Call identifier
+            
+        Returns:
+            timedelta object or None
+        """
+        session = await self.get_session(call_id)
+        if not session:
+            return None
+        
+        end = session.end_time or datetime.now()
+        return end - session.start_time
+
+
+class RedisSessionManager:
+    """
+    Manages active call sessions in Redis so every worker shares state
+    
+    Layout:
+        sess:{call_id}               HASH  session fields
+        sess:{call_id}:interactions  LIST  interaction JSON, oldest first
+        sessions:index               HASH  call_id -> JSON summary
+        sess:lru                     ZSET  call_id scored by last activity
+    
+    Both per-call keys carry a TTL of session_timeout that is refreshed on
+    every write, so Redis expires idle sessions itself. The index lets the
+    dashboard list every call without a keyspace SCAN; cleanup_expired_sessions
+    reads only the expired tail of sess:lru to drop their index entries.
+    """
+    
+    INDEX_KEY = "sessions:index"
+    LRU_KEY = "sess:lru"
+    
+    def __init__(self, redis, session_timeout_minutes: int = 30):
+        """
+        Args:
+            redis: Shared redis.asyncio client (decode_responses=True),
+                   see create_redis_client
+            session_timeout_minutes: Idle TTL for session keys
+        """
+        self.redis = redis
+        self.session_timeout = timedelta(minutes=session_timeout_minutes)
+        self.ttl_seconds = int(self.session_timeout.total_seconds())
+        self._merge_booking = redis.register_script(MERGE_BOOKING_SCRIPT)
+        logger.info("RedisSessionManager initialized")
+    
+    @staticmethod
+    def _session_key(call_id: str) -> str:
+        return f"sess:{call_id}"
+    
+    @staticmethod
+    def _interactions_key(call_id: str) -> str:
+        return f"sess:{call_id}:interactions"
+    
+    def _touch(self, pipe, call_id: str):
+        """Queue TTL and last-activity refreshes for a session on a pipeline"""
+        pipe.expire(self._session_key(call_id), self.ttl_seconds)
+        pipe.expire(self._interactions_key(call_id), self.ttl_seconds)
+        pipe.zadd(self.LRU_KEY, {call_id: time.time()})
+    
+    @staticmethod
+    def _session_summary(session: CallSession) -> bytes:
+        """Serialize the dashboard fields of a session for the index"""
+        return orjson.dumps({
+            "caller_number": session.caller_number,
+            "start_time": session.start_time,
+            "status": session.status,
+            "current_intent": session.current_intent
+        })
+    
+    @staticmethod
+    def _session_to_hash(session: CallSession) -> Dict[str, Any]:
+        """Flatten session fields into Redis hash values (None fields are omitted)"""
+        fields = {
+            "call_id": session.call_id,
+            "caller_number": session.caller_number,
+            "start_time": session.start_time.isoformat(),
+            "status": session.status.value,
+            "context": orjson.dumps(session.context)
+        }
+        if session.end_time:
+            fields["end_time"] = session.end_time.isoformat()
+        if session.current_intent:
+            fields["current_intent"] = session.current_intent
+        if session.booking_data is not None:
+            fields["booking_data"] = orjson.dumps(session.booking_data)
+        if session.customer_id:
+            fields["customer_id"] = session.customer_id
+        return fields
+    
+    @staticmethod
+    def _load_interactions(raw: List[str]) -> List[Interaction]:
+        """Decode a whole LRANGE result with one JSON parse instead of one per item"""
+        if not raw:
+            return []
+        return [Interaction.from_dict(item) for item in orjson.loads("[" + ",".join(raw) + "]")]
+    
+    @staticmethod
+    def _session_from_hash(fields: Dict[str, str], interactions: List[str]) -> CallSession:
+        """Rebuild a CallSession from its hash and interaction list"""
+        booking_data = fields.get("booking_data")
+        end_time = fields.get("end_time")
+        return CallSession(
+            call_id=fields["call_id"],
+            caller_number=fields["caller_number"],
+            start_time=datetime.fromisoformat(fields["start_time"]),
+            end_time=datetime.fromisoformat(end_time) if end_time else None,
+            status=CallStatus(fields["status"]),
+            interactions=RedisSessionManager._load_interactions(interactions),
+            context=orjson.loads(fields.get("context", "{}")),
+            current_intent=fields.get("current_intent"),
+            booking_data=orjson.loads(booking_data) if booking_data is not None else None,
+            customer_id=fields.get("customer_id")
+        )
+    
+    async def create_session(self, call_id: str, caller_number: str) -> CallSession:
+        """
+        Create a new call session
+        
+        Args:
+            call_id: Unique call identifier
+            caller_number: Caller's phone number
+            
+        Returns:
+            CallSession object
+        """
+        if await self.redis.exists(self._session_key(call_id)):
+            existing = await self.get_session(call_id)
+            if existing:
+                logger.warning("Session %s already exists, returning existing", call_id)
+                return existing
+        
+        session = CallSession(
+            call_id=call_id,
+            caller_number=caller_number,
+            start_time=datetime.now(),
+            status=_ACTIVE,
+            interactions=[],
+            context={}
+        )
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._session_key(call_id), mapping=self._session_to_hash(session))
+            self._touch(pipe, call_id)
+            pipe.hset(self.INDEX_KEY, call_id, self._session_summary(session))
+            await pipe.execute()
+        
+        logger.info("Created session for call %s", call_id)
+        return session
+    
+    async def get_session(self, call_id: str) -> Optional[CallSession]:
+        """
+        Retrieve an existing session (one pipelined round trip)
+        Expired sessions are already gone - Redis drops them via TTL
+        
+        Args:
+            call_id: Call identifier
+            
+        Returns:
+            CallSession if found, None otherwise
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._session_key(call_id))
+            pipe.lrange(self._interactions_key(call_id), 0, -1)
+            fields, interactions = await pipe.execute()
+        
+        if not fields:
+            logger.warning("Session %s not found", call_id)
+            return None
+        
+        return self._session_from_hash(fields, interactions)
+    
+    async def update_session(self, call_id: str, updates: Dict) -> bool:
+        """
+        Update session context with new data
+        
+        Args:
+            call_id: Call identifier
+            updates: Dictionary of updates to apply to context
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        key = self._session_key(call_id)
+        raw_context = await self.redis.hget(key, "context")
+        if raw_context is None:
+            return False
+        
+        context = orjson.loads(raw_context)
+        context.update(updates)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, "context", orjson.dumps(context))
+            self._touch(pipe, call_id)
+            await pipe.execute()
+        logger.info("Updated session %s with %s fields", call_id, len(updates))
+        return True
+    
+    async def add_interaction(
+        self, 
+        call_id: str, 
+        speaker: str, 
+        message: str,
+        input_type: Optional[InputType] = None
+    ) -> bool:
+        """
+        Add an interaction (user or AI message) to the session
+        
+        Args:
+            call_id: Call identifier
+            speaker: "user" or "ai"
+            message: The message content
+            input_type: Type of input (speech, dtmf, text)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not await self.redis.exists(self._session_key(call_id)):
+            return False
+        
+        interaction = Interaction(
+            timestamp=datetime.now(),
+            speaker=speaker,
+            message=message,
+            input_type=input_type
+        )
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(self._interactions_key(call_id), orjson.dumps(interaction))
+            pipe.ltrim(self._interactions_key(call_id), -MAX_INTERACTIONS, -1)
+            self._touch(pipe, call_id)
+            await pipe.execute()
+        logger.debug("Added %s interaction to session %s", speaker, call_id)
+        return True
+    
+    async def get_conversation_history(
+        self, 
+        call_id: str, 
+        last_n: Optional[int] = None
+    ) -> List[Interaction]:
+        """
+        Get conversation history for a session
+        
+        Args:
+            call_id: Call identifier
+            last_n: If specified, return only last N interactions
+            
+        Returns:
+            List of Interaction objects
+        """
+        start = -last_n if last_n else 0
+        raw = await self.redis.lrange(self._interactions_key(call_id), start, -1)
+        return self._load_interactions(raw)
+    
+    async def set_intent(self, call_id: str, intent: str) -> bool:
+        """
+        Set the current intent for a session
+        
+        Args:
+            call_id: Call identifier
+            intent: Intent name (e.g., "book_flight", "check_status")
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        key = self._session_key(call_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(key)
+            pipe.hget(self.INDEX_KEY, call_id)
+            exists, raw_summary = await pipe.execute()
+        if not exists:
+            return False
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, "current_intent", intent)
+            self._touch(pipe, call_id)
+            if raw_summary is not None:
+                summary = orjson.loads(raw_summary)
+                summary["current_intent"] = intent
+                pipe.hset(self.INDEX_KEY, call_id, orjson.dumps(summary))
+            await pipe.execute()
+        logger.info("Set intent for %s: %s", call_id, intent)
+        return True
+    
+    async def store_booking_data(self, call_id: str, booking_data: Dict) -> bool:
+        """
+        Store booking-related data in session
+        
+        Args:
+            call_id: Call identifier
+            booking_data: Dictionary containing booking information
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        # Merged server-side so concurrent writers can't drop each other's fields
+        merged = await self._merge_booking(
+            keys=[self._session_key(call_id), self._interactions_key(call_id), self.LRU_KEY],
+            args=[orjson.dumps(booking_data), self.ttl_seconds, time.time(), call_id]
+        )
+        if not merged:
+            return False
+        logger.info("Stored booking data for %s", call_id)
+        return True
+    
+    async def save_session(self, session: CallSession) -> bool:
+        """
+        Persist the intent and booking data changed in place on a session object
+        
+        Only those fields are written, so context updates made through
+        update_session since get_session are kept. Interactions are
+        appended separately via add_interaction
+        
+        Args:
+            session: Session returned by get_session
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        key = self._session_key(session.call_id)
+        if not await self.redis.exists(key):
+            return False
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if session.current_intent:
+                pipe.hset(key, "current_intent", session.current_intent)
+            else:
+                pipe.hdel(key, "current_intent")
+            if session.booking_data is not None:
+                pipe.hset(key, "booking_data", orjson.dumps(session.booking_data))
+            else:
+                pipe.hdel(key, "booking_data")
+            self._touch(pipe, session.call_id)
+            pipe.hset(self.INDEX_KEY, session.call_id, self._session_summary(session))
+            await pipe.execute()
+        return True
+    
+    async def end_session(self, call_id: str, status: CallStatus = CallStatus.COMPLETED) -> bool:
+        """
+        End a call session
+        
+        Args:
+            call_id: Call identifier
+            status: Final status of the call
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._session_key(call_id), self._interactions_key(call_id))
+            pipe.hdel(self.INDEX_KEY, call_id)
+            pipe.zrem(self.LRU_KEY, call_id)
+            deleted, _, _ = await pipe.execute()
+        
+        if not deleted:
+            return False
+        
+        # In production, you would:
+        # 1. Save session to database for analytics
+        # 2. Trigger any cleanup tasks
+        # 3. Send session data to analytics pipeline
+        
+        logger.info("Ended session %s with status %s", call_id, status)
+        return True
+    
+    async def get_active_session_count(self) -> int:
+        """Get count of active sessions"""
+        cutoff = time.time() - self.ttl_seconds
+        return await self.redis.zcount(self.LRU_KEY, f"({cutoff}", "+inf")
+    
+    async def get_all_sessions(self) -> List[Dict]:
+        """
+        Get summary of all active sessions
+        (a fixed number of round trips regardless of how many calls are live)
+        
+        Returns:
+            List of session summaries
+        """
+        cutoff = time.time() - self.ttl_seconds
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self.INDEX_KEY)
+            pipe.zrangebyscore(self.LRU_KEY, f"({cutoff}", "+inf")
+            index, live = await pipe.execute()
+        
+        # Index entries of idle calls stay until cleanup_expired_sessions runs
+        call_ids = sorted(call_id for call_id in live if call_id in index)
+        if not call_ids:
+            return []
+        
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for call_id in call_ids:
+                pipe.llen(self._interactions_key(call_id))
+            counts = await pipe.execute()
+        
+        summaries = []
+        for call_id, count in zip(call_ids, counts):
+            summary = orjson.loads(index[call_id])
+            summaries.append({
+                "call_id": call_id,
+                "caller_number": summary["caller_number"],
+                "start_time": summary["start_time"],
+                "status": CallStatus(summary["status"]),
+                "interaction_count": count,
+                "current_intent": summary["current_intent"]
+            })
+        return summaries
+    
+    async def cleanup_expired_sessions(self) -> int:
+        """
+        Drop bookkeeping for sessions idle past the timeout
+        Redis has already expired their keys; this is O(log n + k) for
+        k expired calls rather than a scan of every session
+        
+        Returns:
+            Number of sessions cleaned up
+        """
+        cutoff = time.time() - self.ttl_seconds
+        expired = await self.redis.zrangebyscore(self.LRU_KEY, "-inf", cutoff)
+        if not expired:
+            return 0
+        
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for call_id in expired:
+                pipe.delete(self._session_key(call_id), self._interactions_key(call_id))
+            pipe.hdel(self.INDEX_KEY, *expired)
+            pipe.zrem(self.LRU_KEY, *expired)
+            await pipe.execute()
         
-        return time_diff > self.session_timeout
+        logger.info("Cleaned up %s expired sessions", len(expired))
+        return len(expired)
     
-    def get_session_duration(self, call_id: str) -> Optional[timedelta]:
+    async def get_session_duration(self, call_id: str) -> Optional[timedelta]:
         """
         Get duration of a session
         
@@ -286,7 +795,7 @@ class SessionManager:
         Returns:
             timedelta object or None
         """
-        session = self.get_session(call_id)
+        session = await self.get_session(call_id)
         if not session:
             return None
         
@@ -0,0 +1,218 @@
+"""
+Session manager backend tests
+Drives the in-memory SessionManager and the Redis-backed RedisSessionManager
+(against fakeredis) through the same async API
+Run with: pytest test_session_managers.py -v
+"""
+
+import asyncio
+import logging
+import time
+import pytest
+import pytest_asyncio
+
+from models import CallStatus, MAX_INTERACTIONS
+from session_manager import SessionManager, RedisSessionManager
+
+logger = logging.getLogger(__name__)
+
+CALLER = "+919876543210"
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def manager(request):
+    """One fresh manager per backend"""
+    if request.param == "memory":
+        yield SessionManager()
+        return
+    
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    yield RedisSessionManager(redis)
+    await redis.aclose()
+
+
+async def expire_session(manager, call_id: str):
+    """Age a session past the timeout without waiting for it"""
+    if isinstance(manager, RedisSessionManager):
+        await manager.redis.zadd(manager.LRU_KEY, {call_id: time.time() - manager.ttl_seconds - 1})
+    else:
+        manager.sessions[call_id].last_activity -= manager.timeout_seconds + 1
+
+
+class TestSessionManagerBackends:
+    """Behaviour shared by every session manager"""
+    
+    @pytest.mark.asyncio
+    async def test_create_and_get(self, manager):
+        """Test session creation, lookup and duplicate creation"""
+        session = await manager.create_session("call_1", CALLER)
+        assert session.call_id == "call_1"
+        assert session.status == CallStatus.ACTIVE
+        
+        again = await manager.create_session("call_1", CALLER)
+        assert again.call_id == "call_1"
+        assert await manager.get_active_session_count() == 1
+        
+        fetched = await manager.get_session("call_1")
+        assert fetched.caller_number == CALLER
+        assert await manager.get_session("missing") is None
+        logger.debug("Session created and retrieved")
+    
+    @pytest.mark.asyncio
+    async def test_interactions_and_history(self, manager):
+        """Test interactions are stored in order and sliced by last_n"""
+        await manager.create_session("call_1", CALLER)
+        for message in ("one", "two", "three"):
+            assert await manager.add_interaction("call_1", "user", message)
+        assert not await manager.add_interaction("missing", "user", "lost")
+        
+        history = await manager.get_conversation_history("call_1")
+        assert [i.message for i in history] == ["one", "two", "three"]
+        recent = await manager.get_conversation_history("call_1", last_n=2)
+        assert [i.message for i in recent] == ["two", "three"]
+        
+        session = await manager.get_session("call_1")
+        assert [i.message for i in session.interactions] == ["one", "two", "three"]
+        logger.debug("Conversation history stored")
+    
+    @pytest.mark.asyncio
+    async def test_history_capped(self, manager):
+        """Test history keeps only the newest MAX_INTERACTIONS turns"""
+        await manager.create_session("call_1", CALLER)
+        for i in range(MAX_INTERACTIONS + 5):
+            await manager.add_interaction("call_1", "user", f"Turn {i}")
+        
+        history = await manager.get_conversation_history("call_1")
+        assert len(history) == MAX_INTERACTIONS
+        assert history[0].message == "Turn 5"
+        logger.debug("History capped")
+    
+    @pytest.mark.asyncio
+    async def test_intent_and_booking_data(self, manager):
+        """Test intent, booking data and in-place edits are persisted"""
+        await manager.create_session("call_1", CALLER)
+        assert await manager.set_intent("call_1", "book_flight")
+        assert await manager.store_booking_data("call_1", {"origin": "Mumbai"})
+        assert await manager.store_booking_data("call_1", {"destination": "Delhi"})
+        assert not await manager.set_intent("missing", "book_flight")
+        
+        session = await manager.get_session("call_1")
+        assert session.current_intent == "book_flight"
+        assert session.booking_data == {"origin": "Mumbai", "destination": "Delhi"}
+        
+        session.booking_data["date"] = "2025-11-15"
+        assert await manager.save_session(session)
+        session = await manager.get_session("call_1")
+        assert session.booking_data["date"] == "2025-11-15"
+        logger.debug("Session state persisted")
+    
+    @pytest.mark.asyncio
+    async def test_save_keeps_context_updates(self, manager):
+        """Test save_session doesn't overwrite context updated after get_session"""
+        await manager.create_session("call_1", CALLER)
+        session = await manager.get_session("call_1")
+        assert await manager.update_session("call_1", {"ai_event": "handoff"})
+        
+        session.current_intent = "check_status"
+        assert await manager.save_session(session)
+        
+        session = await manager.get_session("call_1")
+        assert session.context == {"ai_event": "handoff"}
+        assert session.current_intent == "check_status"
+        logger.debug("Context update kept across save")
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_booking_merges(self, manager):
+        """Test overlapping booking writes all land in the stored data"""
+        await manager.create_session("call_1", CALLER)
+        fields = {f"field_{i}": i for i in range(20)}
+        results = await asyncio.gather(*(
+            manager.store_booking_data("call_1", {name: value})
+            for name, value in fields.items()
+        ))
+        
+        assert all(results)
+        assert not await manager.store_booking_data("missing", {"origin": "Mumbai"})
+        session = await manager.get_session("call_1")
+        assert session.booking_data == fields
+        logger.debug("Concurrent booking merges kept")
+    
+    @pytest.mark.asyncio
+    async def test_end_session(self, manager):
+        """Test ended sessions disappear from lookups, counts and listings"""
+        await manager.create_session("call_1", CALLER)
+        await manager.create_session("call_2", CALLER)
+        
+        assert await manager.end_session("call_1")
+        assert not await manager.end_session("call_1")
+        assert await manager.get_session("call_1") is None
+        assert await manager.get_active_session_count() == 1
+        assert [s["call_id"] for s in await manager.get_all_sessions()] == ["call_2"]
+        logger.debug("Session ended")
+    
+    @pytest.mark.asyncio
+    async def test_expired_sessions_pruned(self, manager):
+        """Test cleanup drops idle sessions and their listing entries"""
+        await manager.create_session("call_1", CALLER)
+        await manager.create_session("call_2", CALLER)
+        await manager.add_interaction("call_2", "user", "still here")
+        await expire_session(manager, "call_1")
+        
+        assert await manager.cleanup_expired_sessions() == 1
+        assert await manager.cleanup_expired_sessions() == 0
+        assert await manager.get_session("call_1") is None
+        assert await manager.get_active_session_count() == 1
+        
+        sessions = await manager.get_all_sessions()
+        assert [s["call_id"] for s in sessions] == ["call_2"]
+        assert sessions[0]["interaction_count"] == 1
+        logger.debug("Expired session pruned")
+
+
+class TestRedisSessionManager:
+    """Redis-specific key layout"""
+    
+    @pytest_asyncio.fixture
+    async def redis_manager(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        yield RedisSessionManager(redis)
+        await redis.aclose()
+    
+    @pytest.mark.asyncio
+    async def test_keys_carry_ttl(self, redis_manager):
+        """Test both per-call keys expire after the session timeout"""
+        await redis_manager.create_session("call_1", CALLER)
+        await redis_manager.add_interaction("call_1", "user", "hello")
+        
+        for key in ("sess:call_1", "sess:call_1:interactions"):
+            ttl = await redis_manager.redis.ttl(key)
+            assert 0 < ttl <= redis_manager.ttl_seconds
+        logger.debug("Session keys carry a TTL")
+    
+    @pytest.mark.asyncio
+    async def test_end_session_clears_bookkeeping(self, redis_manager):
+        """Test ending a session removes its keys, index entry and LRU member"""
+        await redis_manager.create_session("call_1", CALLER)
+        await redis_manager.add_interaction("call_1", "user", "hello")
+        assert await redis_manager.redis.hexists(RedisSessionManager.INDEX_KEY, "call_1")
+        
+        await redis_manager.end_session("call_1")
+        assert not await redis_manager.redis.exists("sess:call_1", "sess:call_1:interactions")
+        assert not await redis_manager.redis.hexists(RedisSessionManager.INDEX_KEY, "call_1")
+        assert await redis_manager.redis.zscore(RedisSessionManager.LRU_KEY, "call_1") is None
+        logger.debug("Redis bookkeeping cleared")
+    
+    @pytest.mark.asyncio
+    async def test_listing_skips_idle_without_writing(self, redis_manager):
+        """Test get_all_sessions hides idle calls and leaves pruning to cleanup"""
+        await redis_manager.create_session("call_1", CALLER)
+        await redis_manager.create_session("call_2", CALLER)
+        await expire_session(redis_manager, "call_1")
+        
+        assert [s["call_id"] for s in await redis_manager.get_all_sessions()] == ["call_2"]
+        assert await redis_manager.redis.hexists(RedisSessionManager.INDEX_KEY, "call_1")
+        assert await redis_manager.cleanup_expired_sessions() == 1
+        assert not await redis_manager.redis.hexists(RedisSessionManager.INDEX_KEY, "call_1")
+        logger.debug("Listing left idle bookkeeping to cleanup")
\ No newline at end of file
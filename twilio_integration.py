@@ -6,13 +6,117 @@ Phone Number: +19789694592
 """
 
 import logging
-from typing import Dict, Optional
-from twilio.twiml.voice_response import VoiceResponse, Gather
-from twilio.rest import Client
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Tuple
+from xml.sax.saxutils import escape
 import os
 
+if TYPE_CHECKING:
+    from twilio.rest import Client
+
 logger = logging.getLogger(__name__)
 
+# Extra entities for XML attribute values
+XML_ATTR_ENTITIES = {'"': "&quot;"}
+
+# Voice settings shared by every <Say>
+SAY_KWARGS = {"voice": "Polly.Aditi", "language": "en-IN"}
+
+# twilio renders attributes in sorted order
+_SAY_OPEN = "<Say " + " ".join(f'{name}="{value}"' for name, value in sorted(SAY_KWARGS.items())) + ">"
+
+# Precomputed TwiML for every response shape
+# Output matches what twilio's VoiceResponse/Gather would render for the same verbs
+WELCOME_TWIML_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?><Response>'
+    f'{_SAY_OPEN}Welcome to Air India Customer Support. How can I help you today?</Say>'
+    '<Gather action="{callback_url}" input="speech" language="en-IN" method="POST" speechTimeout="auto">'
+    f'{_SAY_OPEN}You can say things like: book a flight, check flight status, or speak to an agent.</Say>'
+    '</Gather>'
+    f'{_SAY_OPEN}I didn\'t hear anything. Please call back when you\'re ready.</Say>'
+    '<Hangup /></Response>'
+)
+
+
+def _response_twiml_template(gather_attrs: str) -> str:
+    """Build the response TwiML template for a given set of Gather attributes"""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><Response>'
+        f'{_SAY_OPEN}{{message}}</Say>'
+        f'<Gather action="{{callback_url}}" {gather_attrs} speechTimeout="auto" />'
+        f'{_SAY_OPEN}I didn\'t receive your response. Let me transfer you to an agent.</Say>'
+        '<Dial>+18005551234</Dial></Response>'  # Replace with actual agent number
+    )
+
+
+# Keyed by enable_dtmf
+RESPONSE_TWIML_TEMPLATES = {
+    True: _response_twiml_template('input="speech dtmf" language="en-IN" method="POST" numDigits="1"'),
+    False: _response_twiml_template('input="speech" language="en-IN" method="POST"'),
+}
+
+
+@lru_cache(maxsize=512)
+def _render_response_twiml(message: str, callback_url: str, enable_dtmf: bool) -> str:
+    """Render response TwiML; cached since the AI repeats a small set of prompts"""
+    return RESPONSE_TWIML_TEMPLATES[enable_dtmf].format_map({
+        "message": escape(message),
+        "callback_url": escape(callback_url, XML_ATTR_ENTITIES)
+    })
+
+
+@lru_cache(maxsize=64)
+def _format_menu_options(options_items: Tuple[Tuple[str, str], ...]) -> str:
+    """Spoken list of menu options; cached since menus come from a small fixed set"""
+    return "".join([f"Press {digit} for {description}. " for digit, description in options_items])
+
+
+ERROR_TWIML_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?><Response>'
+    f'{_SAY_OPEN}{{message}}. Please try again later or press 0 to speak with an agent.</Say>'
+    '<Gather input="dtmf" numDigits="1" timeout="5" />'
+    f'{_SAY_OPEN}Thank you for calling. Goodbye.</Say>'
+    '<Hangup /></Response>'
+)
+
+
+def _confirmation_twiml_template(closing: str) -> str:
+    """Build the confirmation TwiML template with a fixed closing line"""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><Response>'
+        f'{_SAY_OPEN}{{message}}</Say>'
+        f'{_SAY_OPEN}{closing}</Say>'
+        '<Hangup /></Response>'
+    )
+
+
+# Keyed by success
+CONFIRMATION_TWIML_TEMPLATES = {
+    True: _confirmation_twiml_template("Thank you for calling Air India. Have a great day!"),
+    False: _confirmation_twiml_template(
+        "Would you like to try again or speak to an agent? Say try again or agent."
+    ),
+}
+
+MENU_TWIML_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?><Response>'
+    '<Gather action="{callback_url}" input="dtmf" method="POST" numDigits="1" timeout="5">'
+    f'{_SAY_OPEN}{{menu_text}}</Say>'
+    '</Gather>'
+    f'{_SAY_OPEN}I didn\'t receive your selection. Please try again.</Say>'
+    '<Redirect>{redirect_url}</Redirect></Response>'
+)
+
+COLLECT_INFO_TWIML_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?><Response>'
+    '<Gather action="{callback_url}" enhanced="true" input="speech" language="en-IN" '
+    'method="POST" speechTimeout="auto">'
+    f'{_SAY_OPEN}{{enhanced_prompt}}</Say>'
+    '</Gather>'
+    f'{_SAY_OPEN}I didn\'t catch that. {{prompt}}</Say>'
+    '<Redirect>{redirect_url}</Redirect></Response>'
+)
+
 
 class TwilioIntegration:
     """
@@ -31,17 +135,45 @@ class TwilioIntegration:
         self.auth_token = auth_token or os.getenv("TWILIO_AUTH_TOKEN")
         self.phone_number = phone_number or os.getenv("TWILIO_PHONE_NUMBER", "+19789694592")
         
-        # Initialize Twilio client if credentials provided
-        if self.account_sid and self.auth_token:
+        # REST client is only needed for outbound calls and SMS; built on first use
+        self._client = None
+        if not self.is_configured:
+            logger.warning("Twilio credentials not provided - client not initialized")
+        
+        # Set by set_callback_url when the web layer's callback URL is fixed
+        self.callback_url: Optional[str] = None
+        self._welcome_twiml: Optional[str] = None
+    
+    @property
+    def is_configured(self) -> bool:
+        """Whether credentials for the Twilio REST API are available"""
+        return bool(self.account_sid and self.auth_token)
+    
+    @property
+    def client(self) -> Optional["Client"]:
+        """Twilio REST client, created on first access; None without credentials"""
+        if self._client is None and self.is_configured:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
-                logger.info(f"Twilio client initialized for {self.phone_number}")
+                # Imported here: twilio.rest pulls in requests and friends (~100 ms),
+                # which TwiML-only processes never need
+                from twilio.rest import Client
+                self._client = Client(self.account_sid, self.auth_token)
+                logger.info("Twilio client initialized for %s", self.phone_number)
             except Exception as e:
-                logger.error(f"Failed to initialize Twilio client: {e}")
-                self.client = None
-        else:
-            self.client = None
-            logger.warning("Twilio credentials not provided - client not initialized")
+                logger.error("Failed to initialize Twilio client: %s", e)
+        return self._client
+    
+    def set_callback_url(self, callback_url: str) -> None:
+        """
+        Pre-render TwiML for the callback URL every call uses
+        
+        Args:
+            callback_url: URL for Twilio to send user input
+        """
+        self.callback_url = callback_url
+        self._welcome_twiml = WELCOME_TWIML_TEMPLATE.format(
+            callback_url=escape(callback_url, XML_ATTR_ENTITIES)
+        )
     
     def generate_welcome_twiml(self, callback_url: str) -> str:
         """
@@ -53,42 +185,15 @@ class TwilioIntegration:
         Returns:
             TwiML string
         """
-        response = VoiceResponse()
-        
-        # Welcome message
-        response.say(
-            "Welcome to Air India Customer Support. How can I help you today?",
-            voice="Polly.Aditi",  # Indian English voice
-            language="en-IN"
-        )
-        
-        # Gather speech input
-        gather = Gather(
-            input='speech',
-            action=callback_url,
-            method='POST',
-            speechTimeout='auto',
-            language='en-IN'
-        )
-        
-        gather.say(
-            "You can say things like: book a flight, check flight status, or speak to an agent.",
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        
-        response.append(gather)
-        
-        # If no input
-        response.say(
-            "I didn't hear anything. Please call back when you're ready.",
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        response.hangup()
+        if callback_url == self.callback_url:
+            twiml = self._welcome_twiml
+        else:
+            twiml = WELCOME_TWIML_TEMPLATE.format_map({
+                "callback_url": escape(callback_url, XML_ATTR_ENTITIES)
+            })
         
         logger.info("Generated welcome TwiML")
-        return str(response)
+        return twiml
     
     def generate_response_twiml(
         self,
@@ -109,39 +214,10 @@ class TwilioIntegration:
         Returns:
             TwiML string
         """
-        response = VoiceResponse()
-        
-        # Speak the message
-        response.say(
-            message,
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        
-        # Gather next input
-        input_type = 'speech dtmf' if enable_dtmf else 'speech'
+        twiml = _render_response_twiml(message, callback_url, bool(enable_dtmf))
         
-        gather = Gather(
-            input=input_type,
-            action=callback_url,
-            method='POST',
-            speechTimeout='auto',
-            language='en-IN',
-            numDigits=1 if enable_dtmf else None
-        )
-        
-        response.append(gather)
-        
-        # Timeout handling
-        response.say(
-            "I didn't receive your response. Let me transfer you to an agent.",
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        response.dial("+18005551234")  # Replace with actual agent number
-        
-        logger.info(f"Generated response TwiML with action: {next_action}")
-        return str(response)
+        logger.info("Generated response TwiML with action: %s", next_action)
+        return twiml
     
     def generate_menu_twiml(
         self,
@@ -160,34 +236,17 @@ class TwilioIntegration:
         Returns:
             TwiML string
         """
-        response = VoiceResponse()
-        
         # Build menu text
-        menu_text = f"{prompt}. "
-        for digit, description in options.items():
-            menu_text += f"Press {digit} for {description}. "
+        menu_text = f"{prompt}. " + _format_menu_options(tuple(options.items()))
         
-        gather = Gather(
-            input='dtmf',
-            action=callback_url,
-            method='POST',
-            numDigits=1,
-            timeout=5
-        )
-        
-        gather.say(menu_text, voice="Polly.Aditi", language="en-IN")
-        response.append(gather)
-        
-        # No input handling
-        response.say(
-            "I didn't receive your selection. Please try again.",
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        response.redirect(callback_url)
+        twiml = MENU_TWIML_TEMPLATE.format_map({
+            "menu_text": escape(menu_text),
+            "callback_url": escape(callback_url, XML_ATTR_ENTITIES),
+            "redirect_url": escape(callback_url)
+        })
         
         logger.info("Generated menu TwiML")
-        return str(response)
+        return twiml
     
     def generate_confirmation_twiml(
         self,
@@ -204,31 +263,10 @@ class TwilioIntegration:
         Returns:
             TwiML string
         """
-        response = VoiceResponse()
-        
-        response.say(
-            message,
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        
-        if success:
-            response.say(
-                "Thank you for calling Air India. Have a great day!",
-                voice="Polly.Aditi",
-                language="en-IN"
-            )
-        else:
-            response.say(
-                "Would you like to try again or speak to an agent? Say try again or agent.",
-                voice="Polly.Aditi",
-                language="en-IN"
-            )
+        twiml = CONFIRMATION_TWIML_TEMPLATES[bool(success)].format_map({"message": escape(message)})
         
-        response.hangup()
-        
-        logger.info(f"Generated confirmation TwiML (success={success})")
-        return str(response)
+        logger.info("Generated confirmation TwiML (success=%s)", success)
+        return twiml
     
     def generate_collect_info_twiml(
         self,
@@ -249,8 +287,6 @@ class TwilioIntegration:
         Returns:
             TwiML string
         """
-        response = VoiceResponse()
-        
         # Enhanced prompts based on field type
         enhanced_prompts = {
             "date": f"{prompt}. For example, say December 25th.",
@@ -258,33 +294,16 @@ class TwilioIntegration:
             "text": prompt
         }
         
-        gather = Gather(
-            input='speech',
-            action=callback_url,
-            method='POST',
-            speechTimeout='auto',
-            language='en-IN',
-            enhanced=True  # Better speech recognition
-        )
-        
-        gather.say(
-            enhanced_prompts.get(field_type, prompt),
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        
-        response.append(gather)
+        # enhanced="true" asks Twilio for better speech recognition
+        twiml = COLLECT_INFO_TWIML_TEMPLATE.format_map({
+            "enhanced_prompt": escape(enhanced_prompts.get(field_type, prompt)),
+            "prompt": escape(prompt),
+            "callback_url": escape(callback_url, XML_ATTR_ENTITIES),
+            "redirect_url": escape(callback_url)
+        })
         
-        # Retry on no input
-        response.say(
-            f"I didn't catch that. {prompt}",
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        response.redirect(callback_url)
-        
-        logger.info(f"Generated info collection TwiML for {field_name}")
-        return str(response)
+        logger.info("Generated info collection TwiML for %s", field_name)
+        return twiml
     
     def generate_error_twiml(
         self,
@@ -299,49 +318,32 @@ class TwilioIntegration:
         Returns:
             TwiML string
         """
-        response = VoiceResponse()
+        twiml = ERROR_TWIML_TEMPLATE.format_map({"message": escape(error_message)})
         
-        response.say(
-            f"{error_message}. Please try again later or press 0 to speak with an agent.",
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        
-        gather = Gather(
-            input='dtmf',
-            numDigits=1,
-            timeout=5
-        )
-        response.append(gather)
-        
-        response.say(
-            "Thank you for calling. Goodbye.",
-            voice="Polly.Aditi",
-            language="en-IN"
-        )
-        response.hangup()
-        
-        logger.error(f"Generated error TwiML: {error_message}")
-        return str(response)
+        logger.error("Generated error TwiML: %s", error_message)
+        return twiml
     
-    def parse_twilio_request(self, form_data: Dict) -> Dict:
+    def parse_twilio_request(self, form_data: Mapping) -> Dict:
         """
         Parse incoming Twilio request data
         
         Args:
-            form_data: Form data from Twilio webhook
+            form_data: Form data from Twilio webhook (any mapping, e.g. FormData)
             
         Returns:
             Normalized request data
         """
+        # Bound once; Starlette's FormData.get is a Python-level method
+        get = form_data.get
+        speech_result = get("SpeechResult")
         return {
-            "call_id": form_data.get("CallSid"),
-            "caller": form_data.get("From"),
-            "user_input": form_data.get("SpeechResult") or form_data.get("Digits"),
-            "input_type": "speech" if form_data.get("SpeechResult") else "dtmf",
-            "call_status": form_data.get("CallStatus"),
-            "from_country": form_data.get("FromCountry"),
-            "to_number": form_data.get("To")
+            "call_id": get("CallSid"),
+            "caller": get("From"),
+            "user_input": speech_result or get("Digits"),
+            "input_type": "speech" if speech_result else "dtmf",
+            "call_status": get("CallStatus"),
+            "from_country": get("FromCountry"),
+            "to_number": get("To")
         }
     
     def make_outbound_call(
@@ -369,10 +371,10 @@ class TwilioIntegration:
                 from_=self.phone_number,
                 url=twiml_url
             )
-            logger.info(f"Outbound call initiated: {call.sid}")
+            logger.info("Outbound call initiated: %s", call.sid)
             return call.sid
         except Exception as e:
-            logger.error(f"Failed to make outbound call: {e}")
+            logger.error("Failed to make outbound call: %s", e)
             return None
     
     def send_sms(self, to_number: str, message: str) -> bool:
@@ -396,8 +398,22 @@ class TwilioIntegration:
                 from_=self.phone_number,
                 body=message
             )
-            logger.info(f"SMS sent: {message.sid}")
+            logger.info("SMS sent: %s", message.sid)
             return True
         except Exception as e:
-            logger.error(f"Failed to send SMS: {e}")
-            return False
\ No newline at end of file
+            logger.error("Failed to send SMS: %s", e)
+            return False
+
+
+@lru_cache(maxsize=None)
+def get_twilio_integration() -> TwilioIntegration:
+    """
+    Shared TwilioIntegration configured from the environment, created on first use
+    
+    Call this at module scope in the web layer rather than per request, so
+    environment lookups and the REST client happen once per process.
+    
+    Returns:
+        The process-wide TwilioIntegration
+    """
+    return TwilioIntegration()
\ No newline at end of file
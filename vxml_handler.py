@@ -5,32 +5,170 @@ Converts AI responses into VXML format
 """
 
 import logging
-from typing import Optional, Dict
+from functools import lru_cache
+from typing import Optional, Dict, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Single-pass replacement for the five XML special characters
+XML_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&apos;'
+})
 
-class VXMLHandler:
-    """
-    Handles VXML generation for IVR responses
-    VXML = VoiceXML, the markup language for voice applications
-    """
-    
-    def __init__(self, base_url: str = "http://localhost:8000"):
-        self.base_url = base_url
-        logger.info("VXMLHandler initialized")
-    
-    def generate_welcome_vxml(self, call_id: str) -> str:
-        """
-        Generate initial welcome VXML when call starts
+# Static fragments of the response, DTMF menu and collect-info documents;
+# joined into per-handler templates once base_url is known
+VXML_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<vxml version="2.1">\n'
+
+# Opens the <filled> block that posts back to the middleware, up to the
+# call_id value
+SUBMIT_OPEN_TEMPLATE = (
+    '\n            \n            <filled>\n'
+    '                <submit \n'
+    '                    next="{base_url}/ivr/user-input" \n'
+    '                    method="post" \n'
+    '                    enctype="application/json">\n'
+    '                    <param name="call_id" expr="\''
+)
+
+DTMF_GRAMMAR = """
+                <grammar type="application/srgs+xml" mode="dtmf">
+                    <![CDATA[
+                    #JSGF V1.0;
+                    grammar digits;
+                    public <digit> = 0 | 1 | 2 | 3 | 4 | 5 | 6 | 7 | 8 | 9;
+                    ]]>
+                </grammar>
+            """
+
+RESPONSE_VOICE_FIELD = """</prompt>
+        </block>
         
-        Args:
-            call_id: Unique call identifier
+        <field name="user_response">
+            <!-- Voice grammar -->
+            <grammar type="application/srgs+xml" mode="voice">
+                <![CDATA[
+                #JSGF V1.0;
+                grammar response;
+                public <response> = <word>+;
+                ]]>
+            </grammar>
             
-        Returns:
-            VXML string
-        """
-        vxml = f"""<?xml version="1.0" encoding="UTF-8"?>
+            """
+
+RESPONSE_VXML_TAIL = """'"/>
+                </submit>
+            </filled>
+            
+            <noinput count="1">
+                <prompt>I didn't hear you. Please repeat.</prompt>
+                <reprompt/>
+            </noinput>
+            
+            <noinput count="2">
+                <prompt>I still didn't hear you. Let me transfer you to an agent.</prompt>
+                <goto next="#transfer_agent"/>
+            </noinput>
+        </field>
+    </form>
+    
+    <form id="transfer_agent">
+        <block>
+            <prompt>Please hold while I transfer you.</prompt>
+            <transfer dest="tel:+18005551234"/>
+        </block>
+    </form>
+</vxml>"""
+
+# Closes the prompt inside <noinput> and the rest of a single-field form
+FIELD_NOINPUT_TAIL = """</prompt>
+                <reprompt/>
+            </noinput>
+        </field>
+    </form>
+</vxml>"""
+
+# Keyed by field_type
+COLLECT_GRAMMARS = {
+    "text": """<grammar type="application/srgs+xml" mode="voice">
+                <![CDATA[
+                #JSGF V1.0;
+                grammar text;
+                public <text> = <word>+;
+                ]]>
+            </grammar>""",
+    "date": """<grammar type="application/srgs+xml" mode="voice">
+                <![CDATA[
+                #JSGF V1.0;
+                grammar date;
+                public <date> = <month> <day> | <day> <month>;
+                <month> = january | february | march | april | may | june | july | august | september | october | november | december;
+                <day> = 1..31;
+                ]]>
+            </grammar>""",
+    "number": """<grammar type="application/srgs+xml" mode="voice">
+                <![CDATA[
+                #JSGF V1.0;
+                grammar number;
+                public <number> = <digit>+;
+                <digit> = 0 | 1 | 2 | 3 | 4 | 5 | 6 | 7 | 8 | 9;
+                ]]>
+            </grammar>"""
+}
+
+
+def _response_vxml_template(submit_open: str, enable_dtmf: bool) -> str:
+    """Build the response VXML template, with or without the DTMF grammar"""
+    return "".join([
+        VXML_HEAD,
+        '    <form id="response">\n        <block>\n            <prompt>{message}',
+        RESPONSE_VOICE_FIELD,
+        DTMF_GRAMMAR if enable_dtmf else "",
+        submit_open,
+        '{call_id}\'"/>\n                    <param name="user_input" expr="user_response"/>\n'
+        '                    <param name="next_action" expr="\'{next_action}',
+        RESPONSE_VXML_TAIL
+    ])
+
+
+def _dtmf_menu_vxml_template(submit_open: str) -> str:
+    """Build the DTMF menu VXML template"""
+    return "".join([
+        VXML_HEAD,
+        '    <form id="dtmf_menu">\n'
+        '        <field name="digit_choice" type="digits?length=1">\n'
+        '            <prompt>{full_prompt}</prompt>',
+        submit_open,
+        '{call_id}\'"/>\n                    <param name="user_input" expr="digit_choice"/>\n'
+        '                    <param name="input_type" expr="\'dtmf\'"/>\n'
+        '                </submit>\n            </filled>\n            \n'
+        '            <noinput>\n                <prompt>I didn\'t receive any input. {options_text}',
+        FIELD_NOINPUT_TAIL
+    ])
+
+
+def _collect_info_vxml_template(submit_open: str, grammar: str) -> str:
+    """Build the collect-info VXML template for one field grammar"""
+    return "".join([
+        VXML_HEAD,
+        '    <form id="collect_{field_name}">\n'
+        '        <field name="{field_name}">\n'
+        '            <prompt>{prompt}</prompt>\n            ',
+        grammar,
+        submit_open,
+        '{call_id}\'"/>\n                    <param name="field_name" expr="\'{field_name}\'"/>\n'
+        '                    <param name="user_input" expr="{field_name}"/>\n'
+        '                </submit>\n            </filled>\n            \n'
+        '            <noinput>\n                <prompt>I didn\'t catch that. {prompt}',
+        FIELD_NOINPUT_TAIL
+    ])
+
+
+# Documents whose shape never changes; only the placeholders vary per call
+WELCOME_VXML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
 <vxml version="2.1">
     <form id="welcome">
         <block>
@@ -52,7 +190,7 @@ class VXMLHandler:
                 <filled>
                     <!-- Send user input back to middleware -->
                     <submit 
-                        next="{self.base_url}/ivr/user-input" 
+                        next="{base_url}/ivr/user-input" 
                         method="post" 
                         namelist="user_input"
                         enctype="application/json">
@@ -75,8 +213,103 @@ class VXMLHandler:
         </block>
     </form>
 </vxml>"""
+
+ERROR_VXML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<vxml version="2.1">
+    <form id="error">
+        <block>
+            <prompt>
+                {error_message}. 
+                Please try again later or press 0 to speak with an agent.
+            </prompt>
+            <disconnect/>
+        </block>
+    </form>
+</vxml>"""
+
+
+@lru_cache(maxsize=64)
+def _format_dtmf_options(options_items: Tuple[Tuple[str, str], ...]) -> str:
+    """Spoken list of DTMF options; cached since menus come from a small fixed set"""
+    return ". ".join([f"Press {digit} for {action}" for digit, action in options_items])
+
+
+class SafeText(str):
+    """
+    Text known to need no XML escaping (no &, < or >), e.g. in-module prompts
+    
+    Any str operation on it returns a plain str, so derived text is escaped again.
+    """
+    __slots__ = ()
+
+
+DEFAULT_ERROR_MESSAGE = SafeText("Sorry, we're experiencing technical difficulties")
+DEFAULT_TRANSACTION_MESSAGE = SafeText("Transaction completed")
+
+
+@lru_cache(maxsize=512)
+def _render_response_parts(
+    template: Tuple[str, str],
+    message: str,
+    next_action: str
+) -> Tuple[str, str]:
+    """
+    Render response VXML on either side of the call_id slot
+    Cached since the AI repeats a small set of prompts
+    
+    Args:
+        template: Response template split at the call_id slot
+        message: Text to speak to user (escaped here unless SafeText)
+        next_action: Next action, or empty string
         
-        logger.info(f"Generated welcome VXML for {call_id}")
+    Returns:
+        (head, tail) strings to join around the call_id
+    """
+    head, tail = template
+    if not isinstance(message, SafeText):
+        message = message.translate(XML_ESCAPE_TABLE)
+    return (
+        head.format_map({"message": message}),
+        tail.format_map({"next_action": next_action})
+    )
+
+
+class VXMLHandler:
+    """
+    Handles VXML generation for IVR responses
+    VXML = VoiceXML, the markup language for voice applications
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:8000"):
+        self.base_url = base_url
+        
+        # Precompiled per shape; callers only fill in the per-call values
+        submit_open = SUBMIT_OPEN_TEMPLATE.format(base_url=base_url)
+        # Split at the call_id slot so everything else can be cached across calls
+        self._response_templates = {
+            enable_dtmf: tuple(_response_vxml_template(submit_open, enable_dtmf).split("{call_id}"))
+            for enable_dtmf in (True, False)
+        }
+        self._collect_templates = {
+            field_type: _collect_info_vxml_template(submit_open, grammar)
+            for field_type, grammar in COLLECT_GRAMMARS.items()
+        }
+        self._dtmf_menu_template = _dtmf_menu_vxml_template(submit_open)
+        logger.info("VXMLHandler initialized")
+    
+    def generate_welcome_vxml(self, call_id: str) -> str:
+        """
+        Generate initial welcome VXML when call starts
+        
+        Args:
+            call_id: Unique call identifier
+            
+        Returns:
+            VXML string
+        """
+        vxml = WELCOME_VXML_TEMPLATE.format_map({"base_url": self.base_url, "call_id": call_id})
+        
+        logger.info("Generated welcome VXML for %s", call_id)
         return vxml
     
     def generate_response_vxml(
@@ -98,72 +331,12 @@ class VXMLHandler:
         Returns:
             VXML string
         """
-        # Escape special XML characters
-        message = self._escape_xml(message)
-        
-        dtmf_grammar = ""
-        if enable_dtmf:
-            dtmf_grammar = """
-                <grammar type="application/srgs+xml" mode="dtmf">
-                    <![CDATA[
-                    #JSGF V1.0;
-                    grammar digits;
-                    public <digit> = 0 | 1 | 2 | 3 | 4 | 5 | 6 | 7 | 8 | 9;
-                    ]]>
-                </grammar>
-            """
-        
-        vxml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<vxml version="2.1">
-    <form id="response">
-        <block>
-            <prompt>{message}</prompt>
-        </block>
-        
-        <field name="user_response">
-            <!-- Voice grammar -->
-            <grammar type="application/srgs+xml" mode="voice">
-                <![CDATA[
-                #JSGF V1.0;
-                grammar response;
-                public <response> = <word>+;
-                ]]>
-            </grammar>
-            
-            {dtmf_grammar}
-            
-            <filled>
-                <submit 
-                    next="{self.base_url}/ivr/user-input" 
-                    method="post" 
-                    enctype="application/json">
-                    <param name="call_id" expr="'{call_id}'"/>
-                    <param name="user_input" expr="user_response"/>
-                    <param name="next_action" expr="'{next_action or ''}'"/>
-                </submit>
-            </filled>
-            
-            <noinput count="1">
-                <prompt>I didn't hear you. Please repeat.</prompt>
-                <reprompt/>
-            </noinput>
-            
-            <noinput count="2">
-                <prompt>I still didn't hear you. Let me transfer you to an agent.</prompt>
-                <goto next="#transfer_agent"/>
-            </noinput>
-        </field>
-    </form>
-    
-    <form id="transfer_agent">
-        <block>
-            <prompt>Please hold while I transfer you.</prompt>
-            <transfer dest="tel:+18005551234"/>
-        </block>
-    </form>
-</vxml>"""
+        head, tail = _render_response_parts(
+            self._response_templates[bool(enable_dtmf)], message, next_action or ""
+        )
+        vxml = head + call_id + tail
         
-        logger.info(f"Generated response VXML for {call_id}")
+        logger.info("Generated response VXML for %s", call_id)
         return vxml
     
     def generate_confirmation_vxml(
@@ -182,7 +355,7 @@ class VXMLHandler:
             VXML string
         """
         success = transaction_result.get("success", False)
-        message = self._escape_xml(transaction_result.get("message", "Transaction completed"))
+        message = self._escape_xml(transaction_result.get("message", DEFAULT_TRANSACTION_MESSAGE))
         
         if success:
             prompt = f"{message}. Is there anything else I can help you with?"
@@ -223,7 +396,7 @@ class VXMLHandler:
     </form>
 </vxml>"""
         
-        logger.info(f"Generated confirmation VXML for {call_id}")
+        logger.info("Generated confirmation VXML for %s", call_id)
         return vxml
     
     def generate_dtmf_menu_vxml(
@@ -246,38 +419,19 @@ class VXMLHandler:
         prompt = self._escape_xml(prompt)
         
         # Build options text
-        options_text = ". ".join([f"Press {digit} for {action}" for digit, action in options.items()])
+        options_text = _format_dtmf_options(tuple(options.items()))
         full_prompt = f"{prompt}. {options_text}"
         
-        vxml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<vxml version="2.1">
-    <form id="dtmf_menu">
-        <field name="digit_choice" type="digits?length=1">
-            <prompt>{full_prompt}</prompt>
-            
-            <filled>
-                <submit 
-                    next="{self.base_url}/ivr/user-input" 
-                    method="post" 
-                    enctype="application/json">
-                    <param name="call_id" expr="'{call_id}'"/>
-                    <param name="user_input" expr="digit_choice"/>
-                    <param name="input_type" expr="'dtmf'"/>
-                </submit>
-            </filled>
-            
-            <noinput>
-                <prompt>I didn't receive any input. {options_text}</prompt>
-                <reprompt/>
-            </noinput>
-        </field>
-    </form>
-</vxml>"""
+        vxml = self._dtmf_menu_template.format_map({
+            "call_id": call_id,
+            "full_prompt": full_prompt,
+            "options_text": options_text
+        })
         
-        logger.info(f"Generated DTMF menu VXML for {call_id}")
+        logger.info("Generated DTMF menu VXML for %s", call_id)
         return vxml
     
-    def generate_error_vxml(self, error_message: str = "Sorry, we're experiencing technical difficulties") -> str:
+    def generate_error_vxml(self, error_message: str = DEFAULT_ERROR_MESSAGE) -> str:
         """
         Generate error VXML
         
@@ -289,20 +443,9 @@ class VXMLHandler:
         """
         error_message = self._escape_xml(error_message)
         
-        vxml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<vxml version="2.1">
-    <form id="error">
-        <block>
-            <prompt>
-                {error_message}. 
-                Please try again later or press 0 to speak with an agent.
-            </prompt>
-            <disconnect/>
-        </block>
-    </form>
-</vxml>"""
+        vxml = ERROR_VXML_TEMPLATE.format_map({"error_message": error_message})
         
-        logger.error(f"Generated error VXML: {error_message}")
+        logger.error("Generated error VXML: %s", error_message)
         return vxml
     
     def generate_collect_info_vxml(
@@ -326,67 +469,19 @@ class VXMLHandler:
         """
         prompt = self._escape_xml(prompt)
         
-        grammar_map = {
-            "text": """<grammar type="application/srgs+xml" mode="voice">
-                <![CDATA[
-                #JSGF V1.0;
-                grammar text;
-                public <text> = <word>+;
-                ]]>
-            </grammar>""",
-            "date": """<grammar type="application/srgs+xml" mode="voice">
-                <![CDATA[
-                #JSGF V1.0;
-                grammar date;
-                public <date> = <month> <day> | <day> <month>;
-                <month> = january | february | march | april | may | june | july | august | september | october | november | december;
-                <day> = 1..31;
-                ]]>
-            </grammar>""",
-            "number": """<grammar type="application/srgs+xml" mode="voice">
-                <![CDATA[
-                #JSGF V1.0;
-                grammar number;
-                public <number> = <digit>+;
-                <digit> = 0 | 1 | 2 | 3 | 4 | 5 | 6 | 7 | 8 | 9;
-                ]]>
-            </grammar>"""
-        }
-        
-        grammar = grammar_map.get(field_type, grammar_map["text"])
+        template = self._collect_templates.get(field_type, self._collect_templates["text"])
+        vxml = template.format_map({
+            "call_id": call_id,
+            "field_name": field_name,
+            "prompt": prompt
+        })
         
-        vxml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<vxml version="2.1">
-    <form id="collect_{field_name}">
-        <field name="{field_name}">
-            <prompt>{prompt}</prompt>
-            {grammar}
-            
-            <filled>
-                <submit 
-                    next="{self.base_url}/ivr/user-input" 
-                    method="post" 
-                    enctype="application/json">
-                    <param name="call_id" expr="'{call_id}'"/>
-                    <param name="field_name" expr="'{field_name}'"/>
-                    <param name="user_input" expr="{field_name}"/>
-                </submit>
-            </filled>
-            
-            <noinput>
-                <prompt>I didn't catch that. {prompt}</prompt>
-                <reprompt/>
-            </noinput>
-        </field>
-    </form>
-</vxml>"""
-        
-        logger.info(f"Generated info collection VXML for {field_name}")
+        logger.info("Generated info collection VXML for %s", field_name)
         return vxml
     
     def _escape_xml(self, text: str) -> str:
         """
-        Escape special XML characters
+        Escape special XML characters; SafeText is returned as-is
         
         Args:
             text: Input text
@@ -394,15 +489,23 @@ class VXMLHandler:
         Returns:
             XML-safe text
         """
-        replacements = {
-            '&': '&amp;',
-            '<': '&lt;',
-            '>': '&gt;',
-            '"': '&quot;',
-            "'": '&apos;'
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
+        if isinstance(text, SafeText):
+            return text
+        return text.translate(XML_ESCAPE_TABLE)
+
+
+@lru_cache(maxsize=None)
+def get_vxml_handler(base_url: str = "http://localhost:8000") -> VXMLHandler:
+    """
+    Shared VXMLHandler for a base URL, created on first use
+    
+    Call this at module scope in the web layer rather than building a
+    handler per request; templates are compiled once per instance.
+    
+    Args:
+        base_url: Base URL the generated VXML submits back to
         
-        return text
\ No newline at end of file
+    Returns:
+        The process-wide VXMLHandler for base_url
+    """
+    return VXMLHandler(base_url)
\ No newline at end of file